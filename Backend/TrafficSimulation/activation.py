@@ -0,0 +1,248 @@
+# Activation ⏰
+# Alternative schedulers for the cars.
+
+# -- Event Driven Activation --
+# Scheduler that only wakes cars when something they depend on changes.
+
+# A car waiting at a red stoplight, or stuck behind other cars, can only
+# wait() until the light changes or the occupancy of the cells it looked at
+# changes. Instead of evaluating it every tick, the car goes to sleep on what
+# blocks it and the patience it would have lost is applied in bulk when it
+# wakes up. Sleepers behind cars also set an alarm for the tick in which
+# their patience changes their behavior. Gridlocked cars (negative patience,
+# every move taken) need no alarm, but replan every tick, so they also get
+# the route of the last tick they skipped.
+
+# Cars that move are evaluated every tick, so it only pays off once the city
+# is congested: with a car every tick, after 1500 steps about 70% of the
+# evaluations are skipped (3 to 4 times fewer, not the 10 times we aimed for).
+
+# The order of activation is shuffled exactly like RandomActivation does, so
+# runs with the same seed match the per tick scheduler.
+
+# -- Synchronous Activation --
+# Cars that can simply take the next cell of their route (free, and not
+# stopped by a red light) propose their moves as arrays. Conflicts over the
+# same cell are resolved in bulk, the car that comes first in the shuffled
+# order wins. Everyone else (losers, blocked and stopped cars) falls back to
+# Car.step in random order once the batch has moved. Results are not the
+# same as RandomActivation, but statistically equivalent.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import heapq
+import itertools
+import numpy as np
+from collections import defaultdict
+from mesa.time import RandomActivation
+
+from .utilities import Colors
+
+class Sleep:
+    def __init__(self, key, since, light = None, cells = None, obstacles = None) -> None:
+        self.key = key
+
+        # Last tick in which the car was evaluated
+        self.since = since
+
+        self.light = light
+        self.cells = cells
+        self.obstacles = obstacles
+
+class EventActivation(RandomActivation):
+    def __init__(self, model) -> None:
+        super().__init__(model)
+        self.sleeping = dict()
+
+        # Who to wake up when a cell frees or a light changes
+        self.cell_waiters = defaultdict(list)
+        self.light_waiters = defaultdict(list)
+        self.alarms = []
+        self.counter = itertools.count()
+
+        # Order of the current tick (built only if someone wakes up mid tick)
+        self.keys = None
+        self.order = None
+        self.cursor = -1
+
+        # Stats
+        self.evaluations = 0
+        self.skipped = 0
+
+    def remove(self, agent) -> None:
+        super().remove(agent)
+        self.sleeping.pop(agent.unique_id, None)
+
+    def sleep(self, agent) -> None:
+        light, cells, waits, obstacles = agent.blocker
+        record = Sleep(agent.unique_id, self.steps, light, cells, obstacles)
+        self.sleeping[agent.unique_id] = record
+
+        # Blocked by cars it also matters if its own light turns red, and
+        # after the given number of waits the car behaves differently
+        if light is None:
+            light = self.model.stoplight_at(agent.pos)
+            for cell in cells:
+                self.cell_waiters[cell].append(record)
+            if waits is not None:
+                heapq.heappush(self.alarms, (self.steps + waits + 1, next(self.counter), record))
+
+        if light is not None:
+            self.light_waiters[light.unique_id].append(record)
+
+    def wake(self, record) -> None:
+        if self.sleeping.get(record.key) is not record: return
+        del self.sleeping[record.key]
+
+        if record.cells is None: return
+
+        # Ticks skipped while blocked by cars would have been waits
+        waits = self.steps - 1 - record.since
+
+        # Woken up by a car that moved after its turn, it waited this tick too
+        if self.keys is not None:
+            if self.order is None:
+                self.order = {key: i for i, key in enumerate(self.keys)}
+            if self.order.get(record.key, -1) < self.cursor:
+                waits += 1
+
+        self.skip(record, waits)
+
+    # Applies the evaluations skipped by a car blocked by cars
+    def skip(self, record, waits) -> None:
+        agent = self._agents[record.key]
+
+        if record.obstacles is None or waits == 0:
+            agent.patience -= waits
+            return
+
+        # The last one replanned (with the patience it had then and the cells
+        # occupied when it slept, nothing it watched changed in between)
+        agent.patience -= waits - 1
+        agent.calculate_route(obstacles=record.obstacles)
+        agent.replanned_at += record.since + waits - self.steps
+        agent.patience -= 1
+
+    # Applies the pending waits of every sleeper (between ticks only)
+    def settle(self) -> None:
+        for record in self.sleeping.values():
+            if record.cells is None: continue
+            self.skip(record, self.steps - 1 - record.since)
+            record.since = self.steps - 1
+
+    # A car left or entered the cell
+    def cell_changed(self, cell: int) -> None:
+        if cell not in self.cell_waiters: return
+        for record in self.cell_waiters.pop(cell):
+            self.wake(record)
+
+    def light_changed(self, light) -> None:
+        if light.unique_id not in self.light_waiters: return
+        for record in self.light_waiters.pop(light.unique_id):
+            self.wake(record)
+
+    def step(self) -> None:
+        while len(self.alarms) > 0 and self.alarms[0][0] <= self.steps:
+            self.wake(heapq.heappop(self.alarms)[2])
+
+        # Same shuffle (and random numbers) as RandomActivation
+        self.keys = self.get_agent_keys()
+        self.model.random.shuffle(self.keys)
+        self.order = None
+
+        for self.cursor, key in enumerate(self.keys):
+            if key not in self._agents: continue
+
+            if key in self.sleeping:
+                self.skipped += 1
+                continue
+
+            agent = self._agents[key]
+            agent.step()
+            self.evaluations += 1
+
+            if agent.blocker is not None:
+                self.sleep(agent)
+
+        self.keys = None
+        self.cursor = -1
+        self.steps += 1
+        self.time += 1
+
+class SynchronousActivation(RandomActivation):
+    def __init__(self, model) -> None:
+        super().__init__(model)
+
+        # Stats
+        self.batched = 0
+        self.conflicts = 0
+        self.fallbacks = 0
+
+    def step(self) -> None:
+        model = self.model
+        height = model.height
+
+        keys = self.get_agent_keys()
+        model.random.shuffle(keys)
+
+        # -- Proposals --
+        moving = [self._agents[key] for key in keys]
+        moving = [car for car in moving if not car.arrived and len(car.route) > 0]
+
+        if len(moving) == 0:
+            self.steps += 1
+            self.time += 1
+            return
+
+        current = np.fromiter((car.pos[0] * height + car.pos[1] for car in moving), 
+                              dtype=np.int64, count=len(moving))
+        target = np.fromiter((car.route.next_cell() for car in moving), 
+                             dtype=np.int64, count=len(moving))
+
+        occupancy = np.frombuffer(model.occupancy, dtype=np.uint8)
+        red = np.zeros(len(occupancy), dtype=bool)
+        red[model.light_cells[model.lights.colors == Colors.RED.value]] = True
+
+        proposals = np.flatnonzero((occupancy[target] == 0) & ~red[current])
+
+        # -- Conflicts --
+        # First occurrence of each target in shuffled order (random priority)
+        _, first = np.unique(target[proposals], return_index=True)
+        winners = np.sort(proposals[first])
+
+        self.conflicts += len(proposals) - len(winners)
+        self.batched += len(winners)
+
+        for i in winners.tolist():
+            car = moving[i]
+            car.move(car.route.pop())
+
+        # -- Per agent logic --
+        # Cells left by the batch stay taken until the turn of the car that
+        # left them, so cars behind it only follow if it went first (like
+        # they would with RandomActivation)
+        vacated = current[winners].tolist()
+        for cell in vacated:
+            model.occupancy[cell] += 1
+
+        winners = winners.tolist()
+        moved = set(winners)
+        released = 0
+
+        for i, car in enumerate(moving):
+            if i in moved: continue
+
+            while released < len(winners) and winners[released] < i:
+                model.occupancy[vacated[released]] -= 1
+                released += 1
+
+            if car.unique_id in self._agents:
+                car.step()
+                self.fallbacks += 1
+
+        for cell in vacated[released:]:
+            model.occupancy[cell] -= 1
+
+        self.steps += 1
+        self.time += 1
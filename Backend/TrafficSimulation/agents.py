@@ -1,7 +1,7 @@
 # Traffic Simulation Agents
 # Definition for the agents used in the traffic simulation.
 
-# Last Update: 20/Nov/2023
+# Last Update: 18/Oct/2026
 # Joaquín Badillo, Pablo Bolio
 
 from mesa import Agent
@@ -11,22 +11,38 @@ from .utilities import (
     Colors
 )
 
+from .dstarlite import DStarLite
+from .route import Route
+from time import perf_counter
+
 from typing import List, Tuple
 
 class Car(Agent):
+    # Mesa agents have a __dict__, but with every attribute in a slot it is
+    # never created (before Python 3.11 that is most of the size of a car)
+    __slots__ = ("unique_id", "model", "pos", "steps_taken", "destination", "route", "planner",
+                 "replanned_at", "initial_patience", "patience", "threshold", "arrived", "blocker")
+
     def __init__(self, unique_id, model, destination) -> None:
         super().__init__(unique_id, model)
         self.steps_taken = 0
         self.destination = destination
-        self.route = []
+        self.route = Route()
+
+        # Incremental planner (only when the model uses D* Lite)
+        self.planner = None
+        self.replanned_at = model.num_steps
 
         self.initial_patience = self.random.randint(1, 5)
         self.patience = self.initial_patience
         self.threshold = self.random.randint(-6, -4)
 
-        self.model = model
         self.arrived = False
 
+        # What makes the car wait no matter what:
+        # (red stoplight, watched cells, waits left, obstacles if gridlocked)
+        self.blocker = None
+
     def action(self) -> None:
         if len(self.route) == 0: 
             return
@@ -34,27 +50,22 @@ class Car(Agent):
         # -- State and Sensoring --
         
         # Stoplight (Currently sensed only in the same cell)
-        stoplight = next(
-            filter(
-                lambda x: type(x) == Stoplight, 
-                self.model.grid.get_cell_list_contents([self.pos])
-            ), 
-            None
-        )
+        stoplight = self.model.stoplight_at(self.pos)
         
         if stoplight is not None:
             if stoplight.state == Colors.RED:
                 self.wait(remove_patience=False)
+                self.blocker = (stoplight, None, None, None)
                 return
 
-        neighbors = self.model.grid.get_neighborhood(self.pos, 
-                                                     moore=False, 
-                                                     include_center=False)
-
         # -- Decision Making --
+
+        metrics = self.model.metrics
         
         # Try to follow route
+        if metrics is not None: start = perf_counter()
         moved = self.follow_route()
+        if metrics is not None: metrics.time("follow_route", start)
         
         if moved: return
 
@@ -64,45 +75,47 @@ class Car(Agent):
         if x != self.pos[0] and y != self.pos[1]:
             if self.patience > 0:
                 self.wait()
+
+                # Nothing changes until the cell frees (or patience runs out)
+                if self.patience > 0:
+                    self.blocker = (None, [self.model.gps.graph.index((x, y))], self.patience, None)
                 return
+
+        neighbors = self.model.grid.get_neighborhood(self.pos, 
+                                                     moore=False, 
+                                                     include_center=False)
         
         # Martyr
         if self.patience <= self.threshold:
             neighs = self.model.gps.get_neighbors(self.pos, self.destination)
-            free = [cell for cell in neighs 
-                    if not any(
-                        True for x in self.model.grid.get_cell_list_contents([cell]) 
-                        if isinstance(x, Car)
-                    )]
+            free = [cell for cell in neighs if not self.model.occupied(cell)]
             if len(free) > 0:
+                if metrics is not None: start = perf_counter()
                 self.move(self.random.choice(free), resotre_patience=False)
-                self.calculate_route(neighbors)
+                self.calculate_route(neighbors, forced=True)
+                if metrics is not None:
+                    metrics.time("martyr", start)
+                    metrics.count("martyr_moves")
                 return
 
         updated = self.calculate_route(neighbors)
         
         if not updated: 
             self.wait()
+            self.stuck(neighbors)
             return
         
         moved = self.follow_route()
 
         if not moved: 
             self.wait()
+            self.stuck(neighbors)
             return
 
     def follow_route(self) -> bool:
         pos = self.route.pop()
 
-        car = next(
-            filter(
-                lambda x: type(x) == Car, 
-                self.model.grid.get_cell_list_contents([pos])
-            ), 
-            None
-        )
-
-        if car is not None:
+        if self.model.occupied(pos):
             self.route.append(pos)
             return False
 
@@ -113,24 +126,61 @@ class Car(Agent):
         if resotre_patience:
             self.patience = self.initial_patience
 
+        self.model.vacate(self.pos)
+        self.model.occupy(pos)
         self.model.grid.move_agent(self, pos)
+        self.model.changes.moved[self.unique_id] = self
+        if self.model.metrics is not None: self.model.metrics.count("moves")
         if pos == self.destination: 
             self.model.arrived_agents.append(self)
+            self.model.changes.arrived.append(self.unique_id)
             self.arrived = True
 
-    def calculate_route(self, neighborhood = None) -> bool:
-        obstacles = set(
-            agent.pos for agent in 
-            self.model.grid.get_cell_list_contents(neighborhood) 
-            if isinstance(agent, Car)
-        ) if neighborhood is not None else set()
+    # forced: the car left its route (martyr move), so the budget can't deny it
+    # obstacles: occupied cells to use instead of the ones in the neighborhood
+    def calculate_route(self, neighborhood = None, forced = False, obstacles = None) -> bool:
+        budget = self.model.budget
+
+        # Over budget, keep the current route
+        if budget is not None and not budget.acquire(self, forced):
+            return False
+
+        start = perf_counter()
+        metrics = self.model.metrics
+        if obstacles is None:
+            obstacles = set(
+                cell for cell in neighborhood if self.model.occupied(cell)
+            ) if neighborhood is not None else set()
 
 
+        neighbor_cost = 4 if self.patience >= 0 else 2**(-self.patience)
+
         def cost(start, neighbor, obstacles = obstacles) -> int:
-            neighbor_cost = 4 if self.patience >= 0 else 2**(-self.patience)
             return neighbor_cost if neighbor in obstacles else self.model.gps.euclidean_distance(start, neighbor)
 
-        path = self.model.gps.astar(self.pos, self.destination, cost=cost)
+        if self.model.planner == "dstar":
+            # Repairs the previous search instead of starting from scratch
+            if self.planner is None:
+                self.planner = DStarLite(self.model.gps, self.destination)
+            expanded = self.planner.expanded
+            path = Route.from_path(self.planner.plan(self.pos, obstacles, neighbor_cost), self.model.gps.graph)
+            self.model.gps.expanded += self.planner.expanded - expanded
+
+        else:
+            # Same position, destination, blocked neighbors and blocking cost
+            # always result in the same route
+            key = (self.pos, self.destination, frozenset(obstacles), neighbor_cost)
+            path = self.model.routes.route(
+                key,
+                lambda: Route.from_path(self.model.gps.astar(self.pos, self.destination, cost=cost), 
+                                        self.model.gps.graph)
+            )
+        if budget is not None: budget.charge(start)
+        if metrics is not None:
+            metrics.time("calculate_route", start)
+            metrics.count("replans")
+        self.replanned_at = self.model.num_steps
+
         tolerance = 1.3 * len(self.route)
 
         if self.patience < 0:
@@ -146,12 +196,41 @@ class Car(Agent):
 
         return True
 
+    # The next evaluations will recalculate the same route and wait again,
+    # until the cells it looked at change or the patience gets negative
+    # (occupied cells get cheaper). Replan budgets depend on every call.
+    def stuck(self, neighborhood) -> None:
+        if self.model.budget is not None: return
+
+        index = self.model.gps.graph.index
+        cells = [index(cell) for cell in neighborhood]
+        cells.append(self.route.next_cell())
+
+        if self.patience >= 0:
+            self.blocker = (None, cells, self.patience + 1, None)
+            return
+
+        # Gridlocked: with negative patience the route changes every time, but
+        # while every cell it can move to stays taken it can't move (not even
+        # as a martyr), so only the last route matters. D* Lite planners keep
+        # state between calls, they are evaluated every tick.
+        if self.model.planner == "dstar": return
+
+        moves = self.model.gps.get_neighbors(self.pos, self.destination)
+        if any(not self.model.occupied(cell) for cell in moves): return
+
+        cells.extend(index(cell) for cell in moves)
+        obstacles = set(cell for cell in neighborhood if self.model.occupied(cell))
+        self.blocker = (None, cells, None, obstacles)
+
     def wait(self, remove_patience = True) -> None:
+        if self.model.metrics is not None: self.model.metrics.count("waits")
         if remove_patience:
             self.patience -= 1
         return
 
     def step(self) -> None:
+        self.blocker = None
         if self.arrived: return
         self.action()
 
@@ -178,18 +257,32 @@ class Road(Agent):
     def step(self) -> None:
         pass
 
+# View over the model's StoplightEngine, which advances every light at once
 class Stoplight(Agent):
     def __init__(self, unique_id, model, state, timer) -> None:
         super().__init__(unique_id, model)
-        self.state = state
-        self.timer = timer
-        self.count = 0
+        self.engine = model.lights
+        self.index = self.engine.add(state, timer)
+
+    @property
+    def state(self) -> Colors:
+        return self.engine.state(self.index)
+
+    @state.setter
+    def state(self, state: Colors) -> None:
+        self.engine.colors[self.index] = state.value
+
+    @property
+    def timer(self) -> int:
+        return int(self.engine.timers[self.index])
+
+    @property
+    def count(self) -> int:
+        return self.engine.count(self.index)
     
     def change_state(self) -> None:
-        self.state = Colors(self.state.value % len(Colors) + 1)
+        self.engine.flip(self.index)
+        self.model.changes.lights.append(self.index)
 
     def step(self) -> None:
-        self.count = (self.count + 1) % self.timer
-        if self.count == 0:
-            self.change_state()
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,76 @@
+# Replanning Budget
+# Bounds how many routes (or how much time replanning) each step can take, so
+# the latency of a step stays predictable under congestion.
+
+# At the beginning of the car phase the waiting cars are ranked by patience
+# deficit and then by how stale their route is. The first ones get a reserved
+# replan for the step, the rest of the budget is first come, first served.
+# Cars over budget keep their current route and wait. The replan after a
+# martyr move is always granted.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import heapq
+from time import perf_counter
+
+class ReplanBudget:
+    def __init__(self, count = None, seconds = None) -> None:
+        self.count = count
+        self.seconds = seconds
+
+        self.tickets = set()
+        self.spare = 0
+        self.elapsed = 0.0
+
+        # Stats (of the last step and overall)
+        self.granted = 0
+        self.denied = 0
+        self.total_granted = 0
+        self.total_denied = 0
+
+    def priority(self, car, step: int):
+        deficit = car.initial_patience - car.patience
+        staleness = step - car.replanned_at
+        return (-deficit, -staleness)
+
+    def reset(self, cars, step: int) -> None:
+        self.elapsed = 0.0
+        self.granted = 0
+        self.denied = 0
+
+        if self.count is None: return
+
+        waiting = [car for car in cars 
+                   if not car.arrived and car.patience < car.initial_patience]
+        ranked = heapq.nsmallest(self.count, waiting, 
+                                 key=lambda car: self.priority(car, step))
+
+        self.tickets = set(car.unique_id for car in ranked)
+        self.spare = self.count - len(self.tickets)
+
+    # Forced replans are always granted (and don't use the budget), a car
+    # that moved off its route can't keep it
+    def acquire(self, car, forced = False) -> bool:
+        allowed = forced or self.seconds is None or self.elapsed < self.seconds
+
+        if allowed and not forced and self.count is not None:
+            if car.unique_id in self.tickets:
+                self.tickets.remove(car.unique_id)
+            elif self.spare > 0:
+                self.spare -= 1
+            else:
+                allowed = False
+
+        if allowed:
+            self.granted += 1
+            self.total_granted += 1
+        else:
+            self.denied += 1
+            self.total_denied += 1
+
+        return allowed
+
+    # Time spent replanning, only matters for the time budget
+    def charge(self, start: float) -> None:
+        self.elapsed += perf_counter() - start
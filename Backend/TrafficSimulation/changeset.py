@@ -0,0 +1,39 @@
+# Change Set
+# What happened during the last step of the model: cars that moved, were
+# spawned, reached their destination or were removed, and stoplights that
+# changed their color.
+
+# The model records it while it steps, so streaming the changes costs as much
+# as the activity of the step instead of the number of agents.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from typing import List
+
+class ChangeSet:
+    def __init__(self) -> None:
+        self.step = 0
+
+        # Agents (not positions), they are read when the changes are sent
+        self.moved = {}
+        self.spawned = []
+        self.arrived = []
+
+        # Ids of the cars taken out of the grid
+        self.removed = []
+
+        # Indices of the lights (stoplight engine) that changed
+        self.lights: List[int] = []
+
+    def clear(self, step: int) -> None:
+        self.step = step
+        self.moved.clear()
+        self.spawned.clear()
+        self.arrived.clear()
+        self.removed.clear()
+        self.lights = []
+
+    def __len__(self) -> int:
+        return (len(self.moved) + len(self.spawned) + len(self.arrived) 
+                + len(self.removed) + len(self.lights))
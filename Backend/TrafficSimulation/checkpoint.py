@@ -0,0 +1,196 @@
+# Checkpoints
+# Everything that changes while a model runs (cars, their routes and
+# patience, stoplight phases, counters and the random number generator) as
+# plain data, so a run can be saved and restored, or forked into many runs
+# with different seeds or parameters.
+
+# A restored model continues exactly like the original one would have. The
+# only exception are D* Lite planners, cars start a new search the next time
+# they replan. Checkpoints are gzipped JSON, positions are flat cell indices
+# and routes are flat int arrays (never pickled, the API accepts them).
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from array import array
+import gzip
+import heapq
+import json
+import numpy as np
+
+from .agents import Car
+from .citymap import ROAD, DESTINATION
+from .route import Route
+from .utilities import Colors
+
+VERSION = 1
+
+def capture(model) -> dict:
+    # Sleeping cars have waits that were not applied yet
+    if model.activation == "event":
+        model.schedule.settle()
+
+    height = model.height
+    cells = lambda positions: [x * height + y for x, y in positions]
+
+    # In the order of the schedule (the shuffles depend on it)
+    cars = [model.agents_by_type[Car][key] for key in model.schedule.get_agent_keys()]
+    _, words, gauss = model.random.getstate()
+
+    return {
+        "version": VERSION,
+        "city": model.city_file,
+        "signature": model.gps.graph.signature(),
+        "params": {
+            "agent_cycle": model.agent_cycle,
+            "post_cycle": model.post_cycle,
+            "limit": model.limit,
+            "planner": model.planner,
+            "activation": model.activation,
+            "replan_budget": None if model.budget is None else model.budget.count,
+            "replan_time_budget": None if model.budget is None else model.budget.seconds,
+            "route_cache_size": model.routes.size,
+        },
+        "counters": {
+            "num_steps": model.num_steps,
+            "num_agents": model.num_agents,
+            "agent_id": model.agent_id,
+            "added_agents": model.added_agents,
+            "num_arrivals": model.num_arrivals,
+            "running": model.running,
+            "schedule_steps": model.schedule.steps,
+            "schedule_time": model.schedule.time,
+        },
+        "random": list(words) + [gauss],
+        "lights": {
+            "ticks": model.lights.ticks,
+            "colors": model.lights.colors.tolist(),
+            "origins": model.lights.origins.tolist(),
+            "pending": [[tick, [int(i) for i in indices]] for tick, indices in model.lights.pending.items()],
+        },
+        "cars": {
+            "ids": [int(car.unique_id[4:]) for car in cars],
+            "cells": cells(car.pos for car in cars),
+            "destinations": cells(car.destination for car in cars),
+            "patience": [[car.patience, car.initial_patience, car.threshold] for car in cars],
+            "arrived": [car.arrived for car in cars],
+            "replanned_at": [car.replanned_at for car in cars],
+            "routes": [car.route.flat() for car in cars],
+            "removing": [int(car.unique_id[4:]) for car in model.arrived_agents],
+        }
+    }
+
+# Checkpoints come from clients, anything that would break the model later
+# (cells out of the map, unknown lights...) is rejected before restoring
+def validate(model, state: dict) -> None:
+    if state.get("version") != VERSION:
+        raise ValueError("Unknown checkpoint version")
+    if state["signature"] != model.gps.graph.signature():
+        raise ValueError("The checkpoint was saved with another city")
+
+    integer = lambda value: type(value) is int
+    size = model.width * model.height
+    kind = model.city.kind
+    # Cells a car can be in (destinations are where they arrive)
+    drivable = lambda cell: integer(cell) and 0 <= cell < size and kind[cell] in (ROAD, DESTINATION)
+    destinations = set(x * model.height + y for x, y in model.destinations)
+
+    cars = state["cars"]
+    count = len(cars["ids"])
+    for name in ("cells", "destinations", "patience", "arrived", "replanned_at", "routes"):
+        if len(cars[name]) != count:
+            raise ValueError(f"Expected {count} car {name}")
+
+    if not all(integer(number) and number >= 0 for number in cars["ids"]):
+        raise ValueError("Car ids must be non negative integers")
+    if len(set(cars["ids"])) != count:
+        raise ValueError("Repeated car ids")
+    if not set(cars["removing"]) <= set(cars["ids"]):
+        raise ValueError("Removing unknown cars")
+
+    if not all(drivable(cell) for cell in cars["cells"]):
+        raise ValueError("Car outside of the roads")
+    if len(set(cars["cells"])) != count:
+        raise ValueError("More than one car in the same cell")
+    if not all(cell in destinations for cell in cars["destinations"]):
+        raise ValueError("Unknown car destination")
+    if not all(drivable(cell) for route in cars["routes"] for cell in route):
+        raise ValueError("Route outside of the roads")
+    if not all(len(patience) == 3 for patience in cars["patience"]):
+        raise ValueError("Expected patience, initial patience and threshold")
+
+    lights = state["lights"]
+    count = len(model.lights)
+    if len(lights["colors"]) != count or len(lights["origins"]) != count:
+        raise ValueError(f"Expected {count} stoplights")
+    if not all(color in (Colors.GREEN.value, Colors.RED.value) for color in lights["colors"]):
+        raise ValueError("Unknown stoplight color")
+    if not all(integer(tick) for tick, _ in lights["pending"]):
+        raise ValueError("Stoplight ticks must be integers")
+    if not all(integer(index) and 0 <= index < count for _, indices in lights["pending"] for index in indices):
+        raise ValueError("Unknown stoplight")
+
+def restore(model, state: dict) -> None:
+    validate(model, state)
+
+    height = model.height
+    position = lambda cell: (cell // height, cell % height)
+
+    # Cars spawned by the constructor
+    for car in list(model.agents_by_type[Car].values()):
+        model.schedule.remove(car)
+        model.vacate(car.pos)
+        model.grid.remove_agent(car)
+        del model.agents_by_type[Car][car.unique_id]
+    model.arrived_agents = []
+
+    cars = state["cars"]
+    for i, number in enumerate(cars["ids"]):
+        car = Car(f"car_{number}", model, position(cars["destinations"][i]))
+        car.patience, car.initial_patience, car.threshold = cars["patience"][i]
+        car.arrived = cars["arrived"][i]
+        car.replanned_at = cars["replanned_at"][i]
+        car.route = Route(array("i", cars["routes"][i]), model.gps.graph.cells)
+
+        pos = position(cars["cells"][i])
+        model.grid.place_agent(car, pos)
+        model.occupy(pos)
+        model.schedule.add(car)
+        model.agents_by_type[Car][car.unique_id] = car
+
+    model.arrived_agents = [model.agents_by_type[Car][f"car_{number}"] for number in cars["removing"]]
+
+    counters = state["counters"]
+    for name in ("num_steps", "num_agents", "agent_id", "added_agents", "num_arrivals", "running"):
+        setattr(model, name, counters[name])
+    model.schedule.steps = counters["schedule_steps"]
+    model.schedule.time = counters["schedule_time"]
+
+    lights = state["lights"]
+    engine = model.lights
+    engine.ticks = lights["ticks"]
+    engine.colors = np.array(lights["colors"], dtype=np.uint8)
+    engine.origins = np.array(lights["origins"], dtype=np.int64)
+    engine.pending = {tick: indices for tick, indices in lights["pending"]}
+    engine.heap = list(engine.pending)
+    heapq.heapify(engine.heap)
+
+    model.changes.clear(model.num_steps)
+
+    # Last, creating the cars used random numbers
+    words = state["random"]
+    model.random.setstate((3, tuple(words[:-1]), words[-1]))
+
+def dumps(state: dict) -> bytes:
+    return gzip.compress(json.dumps(state, separators=(",", ":")).encode())
+
+def loads(data: bytes) -> dict:
+    return json.loads(gzip.decompress(data))
+
+def save(state: dict, path: str) -> None:
+    with open(path, "wb") as file:
+        file.write(dumps(state))
+
+def load(path: str) -> dict:
+    with open(path, "rb") as file:
+        return loads(file.read())
@@ -0,0 +1,270 @@
+# City Map
+# Static layer of the city (roads, obstacles and destinations) stored as typed
+# arrays instead of Mesa agents, since none of them ever act.
+
+# Cells use the same flat index as the road graph (x * height + y), where
+# (x, y) is the grid position: x is the column and y grows upwards, so the
+# first line of the file is the top row of the grid.
+
+# What each character means comes from city_files/mapDictionary.json, so new
+# tiles only need a new entry there. Parsed maps can be compiled into .npy
+# files (keyed by the contents of the file and the legend), later loads map
+# them into memory instead of parsing the text again.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from .agents import Road, Obstacle, Destination
+from .utilities import Directions, Colors, direction_mask
+
+from typing import List, Tuple
+
+# Kinds of cell
+EMPTY = 0
+ROAD = 1
+OBSTACLE = 2
+DESTINATION = 3
+
+# Directions inferred from the neighbors along an axis
+HORIZONTAL = "horizontal"
+VERTICAL = "vertical"
+
+# Each tile of the legend is a dash separated list of words: the kind
+# (roads don't say it), the directions of the road and, for stoplights, the
+# word Stoplight and the initial color. For double directions we used {} and
+# [], curly brackets are up diagonals and brackets are down diagonals.
+# Older maps don't say where stoplights point (s in horizontal roads and S in
+# vertical roads), it is taken from the road next to them.
+KINDS = {"Obstacle": OBSTACLE, "Destination": DESTINATION}
+DIRECTIONS = {"Up": Directions.UP, "Down": Directions.DOWN, "Left": Directions.LEFT, "Right": Directions.RIGHT}
+AXES = {"Horizontal": HORIZONTAL, "Vertical": VERTICAL}
+LIGHTS = {"Red": Colors.RED, "Green": Colors.GREEN}
+
+LEGEND_FILE = f'{os.path.dirname(__file__)}/city_files/mapDictionary.json'
+DEFAULT_CITY_FILE = f'{os.path.dirname(__file__)}/city_files/2023_base.txt'
+
+# Tile of the legend -> (kind, road directions, stoplight)
+def parse_tile(char: str, tile: str) -> Tuple:
+    kind, directions, light, stoplight = ROAD, (), None, False
+
+    for word in tile.split("-"):
+        if word in KINDS: kind = KINDS[word]
+        elif word in DIRECTIONS: directions += (DIRECTIONS[word],)
+        elif word in AXES: directions = AXES[word]
+        elif word in LIGHTS: light = LIGHTS[word]
+        elif word == "Stoplight": stoplight = True
+        else: raise ValueError(f"Unknown word {word!r} in the tile of {char!r}")
+
+    if stoplight != (light is not None):
+        raise ValueError(f"Stoplights need a color (and only stoplights have one): {char!r}")
+
+    return kind, directions, light
+
+# Character -> (kind, road directions, stoplight)
+def load_legend(path: str = LEGEND_FILE) -> dict:
+    with open(path) as legend:
+        return {char: parse_tile(char, tile) for char, tile in json.load(legend).items()}
+
+LEGEND = load_legend()
+
+# Part of the key of compiled maps, a different legend means a different map
+def legend_signature(legend) -> str:
+    entries = sorted(
+        (char, kind, directions if isinstance(directions, str) else direction_mask(directions),
+         0 if light is None else light.value)
+        for char, (kind, directions, light) in legend.items()
+    )
+    return hashlib.sha1(repr(entries).encode()).hexdigest()
+
+# Files of a compiled map (the layers are memory mapped)
+COMPILED_VERSION = 1
+LAYERS = ("kind", "directions")
+
+STOPLIGHT_TIMER = 5
+
+class CityMap:
+    def __init__(self, 
+                 width: int, 
+                 height: int, 
+                 kind: np.ndarray, 
+                 directions: np.ndarray,
+                 destinations: List[Tuple[int]],
+                 stoplights: List[Tuple]) -> None:
+        self.width = width
+        self.height = height
+
+        # One entry per cell (flat index)
+        self.kind = kind
+        self.directions = directions
+
+        # In reading order of the file (the model picks them at random)
+        self.destinations = destinations
+
+        # (position, initial color, timer)
+        self.stoplights = stoplights
+
+    @classmethod
+    def from_lines(cls, lines: List[str], legend = LEGEND) -> "CityMap":
+        rows = [line.rstrip("\n") for line in lines]
+        width, height = len(rows[0]), len(rows)
+
+        # Lookup tables from character code to cell data
+        kind_table = np.zeros(256, dtype=np.uint8)
+        direction_table = np.zeros(256, dtype=np.uint8)
+        light_table = np.zeros(256, dtype=np.uint8)
+
+        inferred = dict()
+
+        for char, (kind, directions, light) in legend.items():
+            code = ord(char)
+            kind_table[code] = kind
+            light_table[code] = 0 if light is None else light.value
+
+            if directions in (HORIZONTAL, VERTICAL):
+                inferred[code] = directions
+            else:
+                direction_table[code] = direction_mask(directions)
+
+        text = "".join(row.ljust(width)[:width] for row in rows)
+        codes = np.frombuffer(text.encode("latin-1"), dtype=np.uint8)
+        codes = codes.reshape(height, width)
+
+        directions = direction_table[codes]
+
+        for code, axis in inferred.items():
+            if axis == HORIZONTAL:
+                mask, shifts = direction_mask((Directions.LEFT, Directions.RIGHT)), ((0, 1), (0, -1))
+            else:
+                mask, shifts = direction_mask((Directions.UP, Directions.DOWN)), ((1, 0), (-1, 0))
+
+            for r, c in zip(*np.nonzero(codes == code)):
+                for dr, dc in shifts:
+                    if 0 <= r + dr < height and 0 <= c + dc < width:
+                        directions[r, c] |= directions[r + dr, c + dc] & mask
+
+        # Text (row, column) to grid (x, y) so that x * height + y is flat
+        def to_grid(layer):
+            return np.ascontiguousarray(layer[::-1].T).ravel()
+
+        # Row-major scan of the text, same order the agents were created in
+        rs, cs = np.nonzero(kind_table[codes] == DESTINATION)
+        destinations = [(int(c), height - int(r) - 1) for r, c in zip(rs, cs)]
+
+        lights = light_table[codes]
+        rs, cs = np.nonzero(lights)
+        stoplights = [
+            ((int(c), height - int(r) - 1), Colors(int(lights[r, c])), STOPLIGHT_TIMER)
+            for r, c in zip(rs, cs)
+        ]
+
+        return cls(width, height, 
+                   to_grid(kind_table[codes]), 
+                   to_grid(directions),
+                   destinations,
+                   stoplights)
+
+    # With a cache directory the map is compiled the first time and loaded
+    # from the compiled files after that
+    @classmethod
+    def from_file(cls, path: str, cache_dir = None, legend = LEGEND) -> "CityMap":
+        with open(path) as city:
+            lines = city.readlines()
+
+        if cache_dir is None: return cls.from_lines(lines, legend)
+
+        digest = hashlib.sha1("".join(lines).encode())
+        digest.update(legend_signature(legend).encode())
+        directory = os.path.join(cache_dir, f"city_{COMPILED_VERSION}_{digest.hexdigest()}")
+
+        if os.path.isdir(directory): return cls.load(directory)
+
+        city = cls.from_lines(lines, legend)
+        city.save(directory)
+        return city
+
+    def save(self, directory: str) -> None:
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+
+        # Written aside and renamed, a directory that exists is complete
+        temporary = tempfile.mkdtemp(dir=parent)
+        try:
+            np.save(os.path.join(temporary, "shape.npy"), np.array([self.width, self.height], dtype=np.int64))
+            np.save(os.path.join(temporary, "kind.npy"), np.ascontiguousarray(self.kind, dtype=np.uint8))
+            np.save(os.path.join(temporary, "directions.npy"), np.ascontiguousarray(self.directions, dtype=np.uint8))
+            np.save(os.path.join(temporary, "destinations.npy"), 
+                    np.array(self.destinations, dtype=np.int32).reshape(-1, 2))
+            np.save(os.path.join(temporary, "stoplights.npy"),
+                    np.array([(x, y, color.value, timer) for (x, y), color, timer in self.stoplights], 
+                             dtype=np.int32).reshape(-1, 4))
+            os.rename(temporary, directory)
+        except OSError:
+            # Another process compiled the same map first
+            if not os.path.isdir(directory): raise
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str) -> "CityMap":
+        width, height = (int(n) for n in np.load(os.path.join(directory, "shape.npy")))
+        layers = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in LAYERS}
+
+        destinations = [(int(x), int(y)) for x, y in np.load(os.path.join(directory, "destinations.npy")).tolist()]
+        stoplights = [
+            ((x, y), Colors(color), timer) 
+            for x, y, color, timer in np.load(os.path.join(directory, "stoplights.npy")).tolist()
+        ]
+
+        return cls(width, height, layers["kind"], layers["directions"], destinations, stoplights)
+
+    # Same for equal maps (maps given as objects share templates with it)
+    def signature(self) -> str:
+        digest = hashlib.sha1(np.array([self.width, self.height]).tobytes())
+        digest.update(np.ascontiguousarray(self.kind).tobytes())
+        digest.update(np.ascontiguousarray(self.directions).tobytes())
+        digest.update(repr(self.destinations).encode())
+        digest.update(repr([(pos, color.value, timer) for pos, color, timer in self.stoplights]).encode())
+        return digest.hexdigest()
+
+    def index(self, pos: Tuple[int]) -> int:
+        return pos[0] * self.height + pos[1]
+
+    def is_road(self, pos: Tuple[int]) -> bool:
+        return self.kind[self.index(pos)] == ROAD
+
+    def road_directions(self, pos: Tuple[int]) -> Tuple:
+        mask = int(self.directions[self.index(pos)])
+        return tuple(direction for direction in Directions 
+                     if mask & direction_mask((direction,)))
+
+    # Compatibility accessor for the visualizers: builds the agent that used
+    # to live in the cell (None for empty cells). Not placed in the grid.
+    def tile(self, model, pos: Tuple[int]):
+        kind = self.kind[self.index(pos)]
+        x, y = pos
+
+        # Same ids the map parser used to give them
+        cell = (self.height - y - 1) * self.width + x
+
+        if kind == ROAD:
+            agent = Road(f"r_{cell}", model, self.road_directions(pos))
+        elif kind == OBSTACLE:
+            agent = Obstacle(f"ob_{cell}", model)
+        elif kind == DESTINATION:
+            agent = Destination(f"d_{cell}", model)
+        else:
+            return None
+
+        agent.pos = pos
+        return agent
+
+    def tiles(self, model):
+        for index in np.flatnonzero(self.kind).tolist():
+            yield self.tile(model, divmod(index, self.height))
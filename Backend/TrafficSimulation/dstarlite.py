@@ -0,0 +1,190 @@
+# D* Lite 🚧
+# Incremental replanning for cars that get blocked.
+
+# A* throws away the previous search every time a car replans, even though
+# only the cells around the car changed cost. D* Lite keeps the search tree
+# (g and rhs values, searched backwards from the goal) and only repairs the
+# vertices affected by the changed edges.
+
+# The planner starts from the static distance field of the destination,
+# which is already a fully consistent solution, and only stores the values
+# that differ from it. So a planner costs nothing until its car gets stuck.
+
+# Based on Koenig & Likhachev, "D* Lite" (AAAI 2002), optimized version.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import heapq
+from typing import Iterable, List, Tuple
+
+INF = float("inf")
+
+class DStarLite:
+    def __init__(self, gps, goal: Tuple[int]) -> None:
+        graph = gps.graph
+        self.graph = graph
+        self.goal = graph.index(goal)
+
+        # Shared static solution, values that differ live in g and rhs
+        self.field = gps.field(goal)
+        self.g = dict()
+        self.rhs = dict()
+
+        # Priority queue with lazy deletion (keys holds the valid key)
+        self.queue = []
+        self.keys = dict()
+
+        self.km = 0
+        self.start = None
+        self.last = None
+
+        # Cells with a dynamic cost (occupied neighbors) -> cost
+        self.blocked = dict()
+
+        # Stats
+        self.expanded = 0
+
+        self._offsets = graph._offsets
+        self._targets = graph._targets
+        self._weights = graph.weights.tolist()
+        self._reverse_offsets = graph.reverse_offsets.tolist()
+        self._sources = graph.sources.tolist()
+        self._goal_only = graph._goal_only
+
+    # Manhattan distance is a lower bound of the cost between any two cells
+    # (straight moves cost 1 and diagonals 2)
+    def heuristic(self, a: int, b: int) -> int:
+        (ax, ay), (bx, by) = self.graph.cells[a], self.graph.cells[b]
+        return abs(ax - bx) + abs(ay - by)
+
+    def get_g(self, s: int) -> float:
+        return self.g.get(s, self.field[s])
+
+    def get_rhs(self, s: int) -> float:
+        return self.rhs.get(s, self.field[s])
+
+    def key(self, s: int) -> Tuple[float]:
+        best = min(self.get_g(s), self.get_rhs(s))
+        return (best + self.heuristic(self.start, s) + self.km, best)
+
+    # Successors that can be used on the way to the goal, with their cost
+    def successors(self, u: int):
+        goal, goal_only, blocked = self.goal, self._goal_only, self.blocked
+        targets, weights = self._targets, self._weights
+
+        for k in range(self._offsets[u], self._offsets[u + 1]):
+            v = targets[k]
+            if goal_only[v] and v != goal: continue
+            yield v, blocked.get(v, weights[k])
+
+    def predecessors(self, v: int) -> List[int]:
+        # Nobody can drive into another destination
+        if self._goal_only[v] and v != self.goal: return []
+        return self._sources[self._reverse_offsets[v]:self._reverse_offsets[v + 1]]
+
+    def update_vertex(self, u: int) -> None:
+        if u != self.goal:
+            g, field = self.g, self.field
+            self.rhs[u] = min(
+                (cost + g.get(v, field[v]) for v, cost in self.successors(u)), 
+                default=INF
+            )
+
+        if self.get_g(u) != self.get_rhs(u):
+            key = self.key(u)
+            self.keys[u] = key
+            heapq.heappush(self.queue, (key, u))
+        else:
+            self.keys.pop(u, None)
+
+    def compute_shortest_path(self) -> None:
+        queue, keys = self.queue, self.keys
+        start = self.start
+
+        while len(queue) > 0:
+            k_old, u = queue[0]
+
+            # Stale entry
+            if keys.get(u) != k_old:
+                heapq.heappop(queue)
+                continue
+
+            if not (k_old < self.key(start) or self.get_rhs(start) != self.get_g(start)):
+                break
+
+            heapq.heappop(queue)
+            k_new = self.key(u)
+
+            if k_old < k_new:
+                keys[u] = k_new
+                heapq.heappush(queue, (k_new, u))
+                continue
+
+            del keys[u]
+            self.expanded += 1
+
+            if self.get_g(u) > self.get_rhs(u):
+                self.g[u] = self.get_rhs(u)
+            else:
+                self.g[u] = INF
+                self.update_vertex(u)
+
+            for s in self.predecessors(u):
+                self.update_vertex(s)
+
+    # Replans from start, where the given cells cost obstacle_cost to enter.
+    # Returns a route in the same format as GPS.astar (or None).
+    def plan(self, 
+             start: Tuple[int], 
+             obstacles: Iterable[Tuple[int]], 
+             obstacle_cost: float) -> List[Tuple[int]]:
+        graph = self.graph
+        self.start = graph.index(start)
+
+        if self.last is not None:
+            self.km += self.heuristic(self.last, self.start)
+        self.last = self.start
+
+        blocked = {graph.index(cell): obstacle_cost for cell in obstacles}
+        changed = [v for v in blocked.keys() | self.blocked.keys() 
+                   if blocked.get(v) != self.blocked.get(v)]
+        self.blocked = blocked
+
+        for v in changed:
+            for u in self.predecessors(v):
+                self.update_vertex(u)
+
+        self.compute_shortest_path()
+
+        return self.extract()
+
+    def extract(self) -> List[Tuple[int]]:
+        cells, field, g, blocked = self.graph.cells, self.field, self.g, self.blocked
+        offsets, targets, weights = self._offsets, self._targets, self._weights
+        goal, goal_only = self.goal, self._goal_only
+
+        current = self.start
+        path = []
+
+        # Same as following successors(), inlined since this is the hot loop
+        while current != goal:
+            best, following = INF, None
+
+            for k in range(offsets[current], offsets[current + 1]):
+                v = targets[k]
+                if goal_only[v] and v != goal: continue
+
+                total = blocked.get(v, weights[k]) + g.get(v, field[v])
+                if total < best:
+                    best, following = total, v
+
+            # Manage impossible paths (and never loop forever)
+            if following is None or len(path) > len(cells): 
+                return None
+
+            path.append(cells[following])
+            current = following
+
+        path.reverse()
+        return path
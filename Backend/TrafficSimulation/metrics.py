@@ -0,0 +1,99 @@
+# Step Metrics
+# Where the time of TrafficModel.step goes and what the cars did, enabled
+# with TrafficModel(metrics=True) (disabled it costs a None check per phase).
+
+# Phases of a step: removal of arrived cars, stoplights, the cars (schedule)
+# and the spawns (with the competition post). Inside the cars phase the time
+# of follow_route, calculate_route and martyr moves is measured too.
+# Counters are totals since the model was created; `last` has the values of
+# the last step only. Waits of sleeping cars (event activation) are applied
+# in bulk, so they are not counted.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from time import perf_counter
+
+PHASES = ("remove", "stoplights", "cars", "spawn")
+CAR_PHASES = ("follow_route", "calculate_route", "martyr")
+COUNTERS = ("astar_calls", "nodes_expanded", "replans", "waits", "moves",
+            "martyr_moves", "spawns", "arrivals", "route_cache_hits", "route_cache_misses")
+
+class StepMetrics:
+    def __init__(self) -> None:
+        self.steps = 0
+        self.seconds = dict.fromkeys(PHASES + CAR_PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+        # Start of the current phase
+        self.mark = 0.0
+
+        # Values of the last step
+        self.last = self.values()
+        self.previous = self.values()
+
+    def start(self) -> None:
+        self.mark = perf_counter()
+
+    # Ends the current phase and starts the next one
+    def lap(self, phase: str) -> None:
+        now = perf_counter()
+        self.seconds[phase] += now - self.mark
+        self.mark = now
+
+    def time(self, phase: str, start: float) -> None:
+        self.seconds[phase] += perf_counter() - start
+
+    def count(self, name: str, amount = 1) -> None:
+        self.counts[name] += amount
+
+    def end_step(self, model) -> None:
+        self.lap("spawn")
+        self.steps += 1
+
+        # Counted by the GPS and the route cache themselves
+        self.counts["astar_calls"] = model.gps.calls
+        self.counts["nodes_expanded"] = model.gps.expanded
+        self.counts["route_cache_hits"] = model.routes.hits
+        self.counts["route_cache_misses"] = model.routes.misses
+        self.counts["arrivals"] = model.num_arrivals
+
+        values = self.values()
+        self.last = {name: values[name] - self.previous[name] for name in values}
+        self.previous = values
+
+    def values(self) -> dict:
+        values = {f"{phase}_seconds": seconds for phase, seconds in self.seconds.items()}
+        values.update((name, self.counts[name]) for name in COUNTERS)
+        return values
+
+# Prometheus text format for a group of models (label -> model)
+def prometheus(models: dict, prefix = "duckcity") -> str:
+    lines = []
+
+    def family(name, kind, description, samples) -> None:
+        lines.append(f"# HELP {prefix}_{name} {description}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            labels = ",".join(f'{key}="{label}"' for key, label in labels.items())
+            lines.append(f"{prefix}_{name}{{{labels}}} {value}")
+
+    family("steps_total", "counter", "Steps run by the model.",
+           [({"session": label}, model.num_steps) for label, model in models.items()])
+    family("cars", "gauge", "Cars in the city.",
+           [({"session": label}, model.num_agents) for label, model in models.items()])
+    family("arrivals_total", "counter", "Cars that reached their destination.",
+           [({"session": label}, model.num_arrivals) for label, model in models.items()])
+
+    measured = {label: model.metrics for label, model in models.items() if model.metrics is not None}
+
+    family("phase_seconds_total", "counter", "Time spent in each phase of the step.",
+           [({"session": label, "phase": phase}, f"{seconds:.6f}")
+            for label, metrics in measured.items() for phase, seconds in metrics.seconds.items()])
+
+    for name in COUNTERS:
+        if name == "arrivals": continue
+        family(f"{name}_total", "counter", f"Total {name.replace('_', ' ')}.",
+               [({"session": label}, metrics.counts[name]) for label, metrics in measured.items()])
+
+    return "\n".join(lines) + "\n"
@@ -1,11 +1,12 @@
 # Traffic Simulation Model
 # Defines a Multigrid model for the traffic simulation.
 
-# The grid will be initialized with roads and stoplights using a document. Also,
-# a given number of cars will be initialized, but after each iteration more cars
-# will be added to the grid.
+# The city (roads, obstacles and destinations) is read from a document into a
+# static map layer, and stoplights are placed in the grid. Also, a given number
+# of cars will be initialized, but after each iteration more cars will be added
+# to the grid.
 
-# Last Update: 20/Nov/2023
+# Last Update: 18/Oct/2026
 # Joaquín Badillo, Pablo Bolio
 
 from mesa import Model
@@ -14,22 +15,22 @@ from mesa.space import MultiGrid
 
 from .agents import (
     Car,
-    Destination,
-    Obstacle,
-    Road,
     Stoplight
 )
 
-from .utilities import (
-    Colors,
-    Directions
-)
-
+from .template import CityTemplate
+from .citymap import CityMap, DEFAULT_CITY_FILE
 from .pathfinder import GPS
-import os
+from .routecache import RouteCache
+from .budget import ReplanBudget
+from .activation import EventActivation, SynchronousActivation
+from .stoplights import StoplightEngine
+from .changeset import ChangeSet
+import numpy as np
 
-import requests
-from threading import Thread
+from .poster import Poster
+from .metrics import StepMetrics
+from . import checkpoint
 
 class TrafficModel(Model):
     def __init__(self,
@@ -38,16 +39,39 @@ class TrafficModel(Model):
                  agent_cycle=10,
                  post_cycle=100,
                  self_url=None,
-                 limit=1000):
+                 limit=1000,
+                 cache_dir=None,
+                 route_cache_size=4096,
+                 planner="astar",
+                 replan_budget=None,
+                 replan_time_budget=None,
+                 activation="random",
+                 seed=None,
+                 city_file=None,
+                 metrics=False):
         super().__init__()
-
-        self.grid = MultiGrid(width, height, True)
-        self.schedule = RandomActivation(self)
         
         # Non-Omniscient GPS
         # Stored in the model to avoid dumb replication
         self.gps = GPS(self)
+
+        # Replanning engine for blocked cars: A* from scratch ("astar") or
+        # incremental D* Lite ("dstar")
+        if planner not in ("astar", "dstar"):
+            raise ValueError(f"Unknown planner: {planner}")
+        self.planner = planner
+
+        # Routes of stuck cars (shared, many cars get stuck in the same place)
+        self.routes = RouteCache(route_cache_size)
+
+        # Max replans (count) and/or replanning time (seconds) per step
+        self.budget = None
+        if replan_budget is not None or replan_time_budget is not None:
+            self.budget = ReplanBudget(replan_budget, replan_time_budget)
         
+        # Per phase timers and counters (None when disabled)
+        self.metrics = StepMetrics() if metrics else None
+
         # Stats
         self.num_steps = 0
         self.num_agents = 0
@@ -62,113 +86,132 @@ class TrafficModel(Model):
 
         self.url = self_url
         self.post_cycle = post_cycle
+        self.poster = Poster(self_url) if self_url is not None else None
 
         self.arrived_agents = []
 
-        with open(f'{os.path.dirname(__file__)}/city_files/2023_base.txt') as city:
-            lines = city.readlines()
-            self.width = len(lines[0])-1
-            self.height = len(lines)
-            
-            self.grid = MultiGrid(self.width, self.height, torus = False) 
+        # Agents of each type by id, updated when they are added or removed
+        # (in the order they were added)
+        self.agents_by_type = {Car: {}, Stoplight: {}}
+
+        # Changes made by the last step. Before the first step it has the
+        # spawns done when the model is created, step() clears them (clients
+        # start from a keyframe)
+        self.changes = ChangeSet()
+
+        # Roads, obstacles and destinations never act, so they live in a
+        # static map layer. Only cars and stoplights are agents.
+        # The map (and everything computed from it) is shared by the models
+        # of this process that use the same file.
+        # city_file is the path of a city file or a CityMap (checkpoints of
+        # maps given as objects need the map again to be restored)
+        if city_file is None:
+            city_file = DEFAULT_CITY_FILE
+
+        if isinstance(city_file, CityMap):
+            template = CityTemplate.from_map(city_file, cache_dir)
+            self.city_file = None
+        else:
+            template = CityTemplate.load(city_file, cache_dir)
+            self.city_file = city_file
+        self.city = template.city
+        self.width = self.city.width
+        self.height = self.city.height
+        self.destinations = list(self.city.destinations)
+
+        self.grid = MultiGrid(self.width, self.height, torus = False) 
+
+        # "random" evaluates every car each tick, "event" only wakes cars
+        # when what blocks them changes (same results for the same seed) and
+        # "synchronous" moves unobstructed cars in a batch
+        if activation == "random":
             self.schedule = RandomActivation(self)
+        elif activation == "event":
+            self.schedule = EventActivation(self)
+        elif activation == "synchronous":
+            self.schedule = SynchronousActivation(self)
+        else:
+            raise ValueError(f"Unknown activation: {activation}")
+        self.activation = activation
+
+        # Stoplight states live in arrays, the agents are views over them
+        self.lights = StoplightEngine()
+
+        for (x, y), state, timer in self.city.stoplights:
+            stoplight = Stoplight(f"tl_{(self.height - y - 1)*self.width+x}", self, state, timer)
+            self.grid.place_agent(stoplight, (x, y))
+            self.traffic_lights.append(stoplight)
+            self.agents_by_type[Stoplight][stoplight.unique_id] = stoplight
+
+        # Static road network and distance fields used by the GPS
+        self.gps.graph = template.graph
+        self.gps.fields = template.fields
+
+        # Number of cars in each cell (flat index) and the stoplight in it
+        # Answers "is there a car here?" without going through the grid
+        self.occupancy = bytearray(self.width * self.height)
+        self.stoplights = [None] * (self.width * self.height)
 
-            # Goes through each character in the map file and creates the 
-            # corresponding agent.
-            # For double directions we used {} and []
-            # Curly brackets are up diagonals and brackets are down diagonals
-            for r, row in enumerate(lines):
-                for c, col in enumerate(row):
-                    if col in "v":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.DOWN,))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in "^":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.UP,))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in ">":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.RIGHT,))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in "<":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.LEFT,))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in "{":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.UP, Directions.LEFT))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in "}":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.UP, Directions.RIGHT))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in "[":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.DOWN, Directions.LEFT,))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in "]":
-                        agent = Road(f"r_{r*self.width+c}", self, (Directions.DOWN, Directions.RIGHT,))
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col in ["y", "Y", "h", "H"]:
-                        stoplight = Stoplight(f"tl_{r*self.width+c}", self, Colors.GREEN, 5)
-                        self.grid.place_agent(stoplight, (c, self.height - r - 1))
-                        self.traffic_lights.append(stoplight)
-
-                        if col == "y":
-                            road = Road(f"r_{r*self.width+c}", self, (Directions.DOWN,))
-                            self.grid.place_agent(road, (c, self.height - r - 1))
-                            stoplight.state = Colors.RED
-                        elif col == "Y":
-                            road = Road(f"r_{r*self.width+c}", self, (Directions.UP,))
-                            self.grid.place_agent(road, (c, self.height - r - 1))
-                            stoplight.state = Colors.RED
-                        elif col == "h":
-                            road = Road(f"r_{r*self.width+c}", self, (Directions.LEFT,))
-                            self.grid.place_agent(road, (c, self.height - r - 1))
-                        elif col == "H":
-                            road = Road(f"r_{r*self.width+c}", self, (Directions.RIGHT,))
-                            self.grid.place_agent(road, (c, self.height - r - 1))
-                        
-                    elif col == "#":
-                        agent = Obstacle(f"ob_{r*self.width+c}", self)
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-
-                    elif col == "D":
-                        agent = Destination(f"d_{r*self.width+c}", self)
-                        self.grid.place_agent(agent, (c, self.height - r - 1))
-                        self.destinations.append((c, self.height - r - 1))
+        for stoplight in self.traffic_lights:
+            self.stoplights[self.gps.graph.index(stoplight.pos)] = stoplight
 
+        # Cell of each light, in the order of the stoplight engine
+        self.light_cells = np.array([self.gps.graph.index(stoplight.pos) 
+                                     for stoplight in self.traffic_lights], dtype=np.int64)
         
-        self.corners = [(0,0), (self.width -1,0), (0,self.height -1), (self.width -1,self.height -1)]
+        self.corners = template.corners
+        self.reachable = template.reachable
         self.running = True
 
-        valid_corners = filter(
-            lambda cell: not any(x for x in self.grid.get_cell_list_contents([cell]) 
-                                 if isinstance(x, Car)),
-            self.corners
-        )
+        self.spawn()
+    
+    def occupied(self, pos) -> bool:
+        return self.occupancy[pos[0] * self.height + pos[1]] > 0
+
+    def stoplight_at(self, pos):
+        return self.stoplights[pos[0] * self.height + pos[1]]
+
+    def occupy(self, pos) -> None:
+        cell = pos[0] * self.height + pos[1]
+        self.occupancy[cell] += 1
+
+        if self.activation == "event":
+            self.schedule.cell_changed(cell)
+
+    def vacate(self, pos) -> None:
+        cell = pos[0] * self.height + pos[1]
+        self.occupancy[cell] -= 1
+
+        if self.activation == "event":
+            self.schedule.cell_changed(cell)
+
+    def spawn(self) -> None:
+        valid_corners = [corner for corner in self.corners 
+                         if not self.occupied(corner) and len(self.reachable[corner]) > 0]
 
         for corner in valid_corners:
-            agent = Car(
-                f"car_{self.agent_id}", 
-                self,
-                self.random.choice(self.destinations)
-            )
-
-            self.grid.place_agent(agent, corner)
-            agent.route = self.gps.astar(agent.pos, agent.destination)
-            self.schedule.add(agent)
-            self.num_agents += 1
-            self.agent_id += 1
-            self.added_agents+=1
-    
+            self.add_car(corner, self.random.choice(self.reachable[corner]))
+
+    # Places a new car in pos, following the static route to its destination
+    def add_car(self, pos, destination) -> Car:
+        agent = Car(f"car_{self.agent_id}", self, destination)
+
+        self.grid.place_agent(agent, pos)
+        self.occupy(pos)
+        agent.route = self.gps.static_route(agent.pos, agent.destination)
+        self.schedule.add(agent)
+        self.agents_by_type[Car][agent.unique_id] = agent
+        self.changes.spawned.append(agent)
+        self.num_agents += 1
+        self.agent_id += 1
+        self.added_agents+=1
+        if self.metrics is not None: self.metrics.count("spawns")
+        return agent
+
     def post(self, num_arrivals):
         if self.url is None:
             return
 
-        print(f"Sending POST request to {self.url}")
         data = {
             "year": 2023,
             "classroom": 301,
@@ -176,27 +219,76 @@ class TrafficModel(Model):
             "num_cars": num_arrivals
         }
 
-        try:
-            requests.post(self.url, json = data)
-        except:
-            print("Error sending POST request")
+        # Sent in the background, a newer count replaces one still waiting
+        self.poster.submit(data)
+
+    # Everything needed to continue this run (see checkpoint.py)
+    def checkpoint(self) -> dict:
+        return checkpoint.capture(self)
+
+    # Continues a checkpoint. A seed forks it into a different run, other
+    # parameters (agent_cycle, limit, activation...) override the saved ones.
+    @classmethod
+    def restore(cls, state, seed = None, **params) -> "TrafficModel":
+        params = {**state["params"], **params}
+        params.setdefault("city_file", state["city"])
+
+        model = cls(**params)
+        checkpoint.restore(model, state)
+        if seed is not None: model.random.seed(seed)
+        return model
+
+    # Sends the last post (if any) and stops the poster
+    def close(self, timeout = None) -> None:
+        if self.poster is not None:
+            self.poster.close(timeout)
 
     def step(self):
+        if self.metrics is None: return self.update()
+
+        self.metrics.start()
+        try:
+            self.update()
+        finally:
+            self.metrics.end_step(self)
+
+    def update(self):
+        metrics = self.metrics
+        self.changes.clear(self.num_steps + 1)
+
         while (len(self.arrived_agents) > 0):
             agent = self.arrived_agents.pop()
+            self.changes.removed.append(agent.unique_id)
             self.num_arrivals += 1
             self.schedule.remove(agent)
+            del self.agents_by_type[Car][agent.unique_id]
+            self.vacate(agent.pos)
             self.grid.remove_agent(agent)
             self.num_agents -= 1
+
+        if metrics is not None: metrics.lap("remove")
         
-        for stoplight in self.traffic_lights:
-            stoplight.step()
+        changed = self.lights.advance()
+        self.changes.lights = changed.tolist()
+
+        if self.activation == "event":
+            for index in self.changes.lights:
+                self.schedule.light_changed(self.traffic_lights[index])
             
+        if self.budget is not None:
+            if self.activation == "event":
+                self.schedule.settle()
+            self.budget.reset(self.schedule.agents, self.num_steps)
+
+        if metrics is not None: metrics.lap("stoplights")
+
         self.schedule.step()
         self.num_steps += 1
 
+        if metrics is not None: metrics.lap("cars")
+
         if self.num_steps % self.post_cycle == 0: 
-            Thread(target=self.post, args=(self.num_arrivals,)).start()
+            self.post(self.num_arrivals)
         
         if self.num_steps == self.limit: 
             self.running = False
@@ -204,25 +296,7 @@ class TrafficModel(Model):
         
         if self.num_steps % self.agent_cycle != 0: return
         
-        valid_corners = filter(
-            lambda cell: not any(x for x in self.grid.get_cell_list_contents([cell]) 
-                                 if isinstance(x, Car)),
-            self.corners
-        )
-
-        for corner in valid_corners:
-            agent = Car(
-                f"car_{self.agent_id}", 
-                self,
-                self.random.choice(self.destinations)
-            )
-
-            self.grid.place_agent(agent, corner)
-            agent.route = self.gps.astar(agent.pos, agent.destination)
-            self.schedule.add(agent)
-            self.num_agents += 1
-            self.agent_id += 1
-            self.added_agents+=1
+        self.spawn()
 
         if self.added_agents == 0: 
             self.running = False
@@ -2,87 +2,133 @@
 # Fine... I'll do it myself (╯°□°）╯︵ ┻━┻
 
 # A* Pathfinding Algorithm Implementation
-# Uses the model to determine valid neighbors
+# Uses the compiled road graph of the model to determine valid neighbors
 
-# Last Update: 21/Nov/2023
+# Last Update: 18/Oct/2026
 # Joaquín Badillo, Pablo Bolio
 
 import heapq
-from .agents import Road, Obstacle, Destination
-from .utilities import Directions
+import os
+import tempfile
+import numpy as np
+from .route import Route
+from .utilities import direction_mask
 from typing import Tuple, List, Callable
 
 class GPS:
     def __init__(self, model):
         self.model = model
+        self.graph = None
+
+        # Distance fields (exact static cost to each destination)
+        self.fields = dict()
+
+        # Static routes by (start, goal) cell, shared by the cars that use them
+        self.static_routes = dict()
+
+        # Stats (searches and nodes expanded, D* Lite planners add theirs)
+        self.calls = 0
+        self.expanded = 0
+
+    # Precomputes the distance field of every destination. Fields only
+    # depend on the map, so they can be cached to disk and reused.
+    def prepare(self, destinations, cache_dir = None) -> None:
+        path = None
+
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, f"fields_{self.graph.signature()}.npz")
+
+            if os.path.exists(path):
+                with np.load(path) as cached:
+                    for name in cached.files:
+                        self.fields[int(name)] = cached[name].tolist()
+
+        missing = [self.graph.index(destination) for destination in destinations
+                   if self.graph.index(destination) not in self.fields]
+
+        for goal in missing:
+            self.fields[goal] = self.graph.distance_field(goal).tolist()
+
+        if path is not None and len(missing) > 0:
+            os.makedirs(cache_dir, exist_ok=True)
+
+            # Written aside and renamed, other processes never read half a file
+            descriptor, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".npz")
+            try:
+                with os.fdopen(descriptor, "wb") as cached:
+                    np.savez(cached, **{str(goal): np.array(field) 
+                                        for goal, field in self.fields.items()})
+                os.replace(temporary, path)
+            finally:
+                if os.path.exists(temporary): os.remove(temporary)
+
+    def field(self, end: Tuple[int]) -> List[float]:
+        goal = self.graph.index(end)
+        if goal not in self.fields:
+            self.fields[goal] = self.graph.distance_field(goal).tolist()
+        return self.fields[goal]
+
+    # Exact static cost from position to end. Dynamic costs (obstacles) are
+    # never cheaper than static ones, so this is an admissible heuristic.
+    def distance(self, position: Tuple[int], end: Tuple[int]) -> float:
+        return self.field(end)[self.graph.index(position)]
+
+    # Shortest static route following the gradient of the distance field
+    # Same format as astar (reversed, without the starting cell)
+    def route(self, start: Tuple[int], end: Tuple[int]) -> List[Tuple[int]]:
+        graph = self.graph
+        field = self.field(end)
+        goal = graph.index(end)
+        current = graph.index(start)
+
+        if field[current] == float("inf"): return None
+
+        path = []
+
+        while current != goal:
+            position = graph.cells[current]
+            for neighbor in graph.neighbors(current, goal):
+                if field[neighbor] + self.euclidean_distance(position, graph.cells[neighbor]) == field[current]:
+                    current = neighbor
+                    break
+            path.append(graph.cells[current])
+
+        path.reverse()
+        return path
+
+    # Same as route, but computed once per start and destination (every car
+    # spawned in a corner with the same destination shares the cells)
+    def static_route(self, start: Tuple[int], end: Tuple[int]) -> Route:
+        key = (self.graph.index(start), self.graph.index(end))
+        if key not in self.static_routes:
+            self.static_routes[key] = Route.from_path(self.route(start, end), self.graph)
+
+        route = self.static_routes[key]
+        return None if route is None else route.copy()
 
     def inside(self, x, y) -> bool:
         return 0 <= x < self.model.width and 0 <= y < self.model.height
 
     def valid(self, x, y, directions: Tuple[Tuple[int]], goal: Tuple[int]) -> bool:
         if not self.inside(x, y): return False
-        
-        cell = self.model.grid.get_cell_list_contents([(x, y)])
 
-        destination = next(filter(lambda agent: type(agent) == Destination, cell), None)
+        graph = self.graph
+        index = graph.index((x, y))
 
-        if destination is not None and destination.pos == goal: return True
+        # Destinations can only be entered when they are the goal
+        if graph.destinations[index]: return (x, y) == tuple(goal)
 
-        # To block a route (on recalculation) an agent can add temp obstacles
-        obstacles = tuple(filter(lambda agent: type(agent) == Obstacle, cell))
+        if graph.obstacles[index]: return False
 
-        if len(obstacles) > 0: return False
-        
-        road = next(filter(lambda agent: type(agent) == Road, cell), None)
-
-        if road is None: return False
-        
         # Check if the direction of the road matches with direction of movement
-        # Sidenote... although this trashy code is O(n^2), n is at most 2
-        # Yes, we could use a set, but hashing might take longer with 2 elements
-        return any(direction in road.directions for direction in directions)
+        return bool(graph.directions[index] & direction_mask(directions))
     
     def get_neighbors(self, position, end) -> List[Tuple]:
-        neighbors = []
-        x, y = position
-
-        # -- Straight Directions --
-
-        # ↓
-        if self.valid(x, y - 1, (Directions.DOWN,), end):
-            neighbors.append((x, y - 1))
-        
-        # → 
-        if self.valid(x + 1, y, (Directions.RIGHT,), end):
-            neighbors.append((x + 1, y))
-
-        # ↑
-        if self.valid(x, y + 1, (Directions.UP,), end):
-            neighbors.append((x, y + 1))
-        
-        # ←
-        if self.valid(x - 1, y, (Directions.LEFT,), end):
-            neighbors.append((x - 1, y))
-
-        # -- Diagonals --
-
-        # ↖ (Works for ↑ and ← roads) 
-        if self.valid(x - 1, y + 1, (Directions.UP, Directions.LEFT), end):
-            neighbors.append((x - 1, y + 1))
-
-        # ↗ (Works for ↑ and → roads)
-        if self.valid(x + 1, y + 1, (Directions.UP, Directions.RIGHT), end):
-            neighbors.append((x + 1, y + 1))
-
-        # ↘ (Works for ↓ and → roads)
-        if self.valid(x + 1, y - 1, (Directions.DOWN, Directions.RIGHT), end):
-            neighbors.append((x + 1, y - 1))
-
-        # ↙ (Works for ↓ and ← roads)
-        if self.valid(x - 1, y - 1, (Directions.DOWN, Directions.LEFT), end):
-            neighbors.append((x - 1, y - 1))
-
-        return neighbors
+        graph = self.graph
+        return [
+            graph.position(neighbor) for neighbor in 
+            graph.neighbors(graph.index(position), graph.index(end))
+        ]
 
     # Avoid sqrt for performance
     def euclidean_distance(self, start: Tuple[int], end: Tuple[int]) -> float:
@@ -103,40 +149,58 @@ class GPS:
         
         # Default values
         if cost is None: cost = self.euclidean_distance
-        if heuristic is None: heuristic = self.manhattan_distance
+        if heuristic is None: heuristic = self.distance
+
+        self.calls += 1
+
+        # Costs never drop below the static ones, so unreachable stays unreachable
+        if heuristic(start, end) == float("inf"): return None
+
+        graph = self.graph
+        cells = graph.cells
+        goal = graph.index(end)
+        source = graph.index(start)
 
         pq = []
-        heapq.heappush(pq, (0, start))
+        heapq.heappush(pq, (0, source))
 
         came_from = dict()
         cost_so_far = dict()
 
-        came_from[start] = None
-        cost_so_far[start] = 0
+        came_from[source] = None
+        cost_so_far[source] = 0
+
+        expanded = 0
 
         while len(pq) > 0:
             current = heapq.heappop(pq)[1]
 
-            if current == end:
+            if current == goal:
                 break
 
-            for neighbor in self.get_neighbors(current, end):
-                new_cost = cost_so_far[current] + cost(current, neighbor)
+            expanded += 1
+
+            position = cells[current]
+
+            for neighbor in graph.neighbors(current, goal):
+                new_cost = cost_so_far[current] + cost(position, cells[neighbor])
                 if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
                     cost_so_far[neighbor] = new_cost
-                    priority = new_cost + heuristic(neighbor, end)
+                    priority = new_cost + heuristic(cells[neighbor], end)
                     heapq.heappush(pq, (priority, neighbor))
                     came_from[neighbor] = current
 
+        self.expanded += expanded
+
         # Manage impossible paths ᓚᘏᗢ
-        if end not in came_from:
+        if goal not in came_from:
             return None
 
         path = []
-        current = end
+        current = goal
 
-        while current != start:
-            path.append(current)
+        while current != source:
+            path.append(cells[current])
             current = came_from[current]
 
         return path
\ No newline at end of file
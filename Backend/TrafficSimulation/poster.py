@@ -0,0 +1,96 @@
+# Competition Poster
+# Sends the number of arrivals to the competition server from a single
+# background thread, so a slow or dead server never slows the simulation.
+
+# There is room for one pending post: when posts back up, a new one replaces
+# the one waiting (only the latest count matters). Connections are pooled in
+# a requests.Session, every request has a timeout and failed posts are
+# retried with exponential backoff, unless a newer post arrives first.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from threading import Condition, Thread
+from time import monotonic
+
+import requests
+from requests.adapters import HTTPAdapter
+
+class Poster(Thread):
+    def __init__(self, url, timeout = 5.0, retries = 3, backoff = 0.5) -> None:
+        super().__init__(daemon=True)
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.http = requests.Session()
+        self.http.mount("http://", HTTPAdapter(pool_maxsize=1))
+        self.http.mount("https://", HTTPAdapter(pool_maxsize=1))
+
+        self.condition = Condition()
+        self.pending = None
+        self.closed = False
+
+        # Stats
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.coalesced = 0
+
+    def submit(self, data) -> None:
+        with self.condition:
+            if self.closed: return
+            if self.pending is not None: self.coalesced += 1
+            self.pending = data
+            self.condition.notify()
+
+            # Started with the first post
+            if self.ident is None: self.start()
+
+    # Waits until the pending post is sent (or times out) and stops the thread
+    def close(self, timeout = None) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+        if self.ident is not None: self.join(timeout)
+        else: self.http.close()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None: break
+
+                data, self.pending = self.pending, None
+
+            self.send(data)
+
+        self.http.close()
+
+    def send(self, data) -> None:
+        print(f"Sending POST request to {self.url}")
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.http.post(self.url, json = data, timeout = self.timeout)
+                if response.status_code < 500:
+                    self.sent += 1
+                    return
+            except requests.RequestException:
+                pass
+
+            if attempt == self.retries: break
+
+            # Backs off, a newer post cancels the retry
+            deadline = monotonic() + self.backoff * 2**attempt
+            with self.condition:
+                while self.pending is None and monotonic() < deadline:
+                    self.condition.wait(deadline - monotonic())
+                if self.pending is not None: break
+            self.retried += 1
+
+        self.failed += 1
+        print("Error sending POST request")
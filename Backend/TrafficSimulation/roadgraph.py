@@ -0,0 +1,159 @@
+# Road Graph
+# Compiles the static road network into a compact adjacency structure (CSR)
+# so the GPS does not have to scan grid cells every time A* expands a node.
+
+# Cells are identified by a flat index (x * height + y). This keeps the same
+# ordering as (x, y) tuples, so the priority queue in A* breaks ties exactly
+# like it did before.
+
+# The graph also computes distance fields: the exact static cost from every
+# cell to a destination (reverse Dijkstra over the compiled edges).
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import hashlib
+import heapq
+import numpy as np
+
+from .citymap import OBSTACLE, DESTINATION
+from .utilities import Directions, direction_mask
+
+from typing import List, Tuple
+
+# Candidate moves in the order the GPS has always explored them
+# (dx, dy, directions of the target road that allow the move)
+MOVES = (
+    (0, -1, direction_mask((Directions.DOWN,))),                      # ↓
+    (1, 0, direction_mask((Directions.RIGHT,))),                      # →
+    (0, 1, direction_mask((Directions.UP,))),                         # ↑
+    (-1, 0, direction_mask((Directions.LEFT,))),                      # ←
+    (-1, 1, direction_mask((Directions.UP, Directions.LEFT))),        # ↖
+    (1, 1, direction_mask((Directions.UP, Directions.RIGHT))),        # ↗
+    (1, -1, direction_mask((Directions.DOWN, Directions.RIGHT))),     # ↘
+    (-1, -1, direction_mask((Directions.DOWN, Directions.LEFT))),     # ↙
+)
+
+class RoadGraph:
+    def __init__(self, width, height, directions, obstacles, destinations) -> None:
+        self.width = width
+        self.height = height
+
+        # One entry per cell
+        self.directions = np.asarray(directions, dtype=np.uint8)
+        self.obstacles = np.asarray(obstacles, dtype=bool)
+        self.destinations = np.asarray(destinations, dtype=bool)
+
+        self.offsets, self.targets = self.compile()
+        self.weights = self.edge_weights()
+        self.reverse_offsets, self.sources, self.reverse_weights = self.reverse()
+
+        # Python lists are a lot faster than numpy scalars inside the A* loop
+        self._offsets = self.offsets.tolist()
+        self._targets = self.targets.tolist()
+        self._goal_only = self.destinations.tolist()
+        self.cells = [divmod(i, height) for i in range(width * height)]
+
+    @classmethod
+    def from_city(cls, city) -> "RoadGraph":
+        return cls(city.width, 
+                   city.height, 
+                   city.directions, 
+                   city.kind == OBSTACLE, 
+                   city.kind == DESTINATION)
+
+    def compile(self) -> Tuple[np.ndarray, np.ndarray]:
+        size = self.width * self.height
+        xs, ys = np.divmod(np.arange(size), self.height)
+
+        # -1 marks a move that is not allowed
+        candidates = np.full((size, len(MOVES)), -1, dtype=np.int32)
+
+        for k, (dx, dy, mask) in enumerate(MOVES):
+            tx, ty = xs + dx, ys + dy
+            inside = (0 <= tx) & (tx < self.width) & (0 <= ty) & (ty < self.height)
+            target = np.where(inside, tx * self.height + ty, 0)
+
+            # Destinations are kept as edges, but only the goal may use them
+            allowed = inside & (
+                self.destinations[target] |
+                (~self.obstacles[target] & ((self.directions[target] & mask) != 0))
+            )
+            candidates[allowed, k] = target[allowed]
+
+        valid = candidates >= 0
+        offsets = np.zeros(size + 1, dtype=np.int32)
+        np.cumsum(valid.sum(axis=1), out=offsets[1:])
+
+        # Row-major selection keeps the move order of each cell
+        return offsets, candidates[valid]
+
+    # Static cost of each edge, same as GPS.euclidean_distance (no sqrt)
+    def edge_weights(self) -> np.ndarray:
+        sources = np.repeat(np.arange(self.width * self.height), np.diff(self.offsets))
+        dx = sources // self.height - self.targets // self.height
+        dy = sources % self.height - self.targets % self.height
+        return (dx * dx + dy * dy).astype(np.int32)
+
+    # Predecessors of each cell (the same edges, grouped by target)
+    def reverse(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        size = self.width * self.height
+        sources = np.repeat(np.arange(size, dtype=np.int32), np.diff(self.offsets))
+        order = np.argsort(self.targets, kind="stable")
+
+        offsets = np.zeros(size + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.targets, minlength=size), out=offsets[1:])
+
+        return offsets, sources[order], self.weights[order]
+
+    # Reverse Dijkstra from the goal, unreachable cells are left as inf
+    def distance_field(self, goal: int) -> np.ndarray:
+        offsets = self.reverse_offsets.tolist()
+        sources = self.sources.tolist()
+        weights = self.reverse_weights.tolist()
+        goal_only = self._goal_only
+
+        distance = [float("inf")] * (self.width * self.height)
+        distance[goal] = 0
+
+        pq = [(0, goal)]
+
+        while len(pq) > 0:
+            d, current = heapq.heappop(pq)
+            if d > distance[current]: continue
+
+            for k in range(offsets[current], offsets[current + 1]):
+                previous = sources[k]
+                new_distance = d + weights[k]
+
+                if new_distance < distance[previous]:
+                    distance[previous] = new_distance
+
+                    # Other destinations can only be a starting point, they
+                    # can't be crossed on the way to the goal
+                    if not goal_only[previous]:
+                        heapq.heappush(pq, (new_distance, previous))
+
+        return np.array(distance)
+
+    # Identifies the compiled map (used to name cached distance fields)
+    def signature(self) -> str:
+        digest = hashlib.sha1(np.array([self.width, self.height]).tobytes())
+        digest.update(self.directions.tobytes())
+        digest.update(self.obstacles.tobytes())
+        digest.update(self.destinations.tobytes())
+        return digest.hexdigest()
+
+    def index(self, position: Tuple[int]) -> int:
+        return position[0] * self.height + position[1]
+
+    def position(self, index: int) -> Tuple[int]:
+        return self.cells[index]
+
+    def neighbors(self, index: int, goal: int) -> List[int]:
+        goal_only = self._goal_only
+        return [
+            neighbor for neighbor in 
+            self._targets[self._offsets[index]:self._offsets[index + 1]]
+            if not goal_only[neighbor] or neighbor == goal
+        ]
@@ -0,0 +1,62 @@
+# Routes
+# The cells a car still has to visit, stored as flat cell indices
+# (x * height + y) in an int array instead of a list of tuples.
+
+# Like the paths of the GPS, routes are reversed (the next cell is the last
+# one) and cars consume them from the end. A route is a view over the first
+# `size` cells of its array, so the rest of a route is always a prefix of the
+# original one and many cars can share the same array (the static routes of
+# the spawns and the routes of the route cache). Arrays are never written.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from array import array
+from typing import List, Tuple
+
+EMPTY = array("i")
+
+class Route:
+    __slots__ = ("cells", "positions", "size")
+
+    # positions: cell index -> position (RoadGraph.cells)
+    def __init__(self, cells = EMPTY, positions = None, size = None) -> None:
+        self.cells = cells
+        self.positions = positions
+        self.size = len(cells) if size is None else size
+
+    @classmethod
+    def from_path(cls, path: List[Tuple[int]], graph) -> "Route":
+        if path is None: return None
+        height = graph.height
+        return cls(array("i", [x * height + y for x, y in path]), graph.cells)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, i: int) -> Tuple[int]:
+        if i < 0: i += self.size
+        if not 0 <= i < self.size: raise IndexError("route index out of range")
+        return self.positions[self.cells[i]]
+
+    def pop(self) -> Tuple[int]:
+        if self.size == 0: raise IndexError("pop from empty route")
+        self.size -= 1
+        return self.positions[self.cells[self.size]]
+
+    # The array is shared, only the cell that was just popped can go back
+    def append(self, position: Tuple[int]) -> None:
+        if self.size == len(self.cells) or self.positions[self.cells[self.size]] != position:
+            raise ValueError("only the last popped cell can be put back")
+        self.size += 1
+
+    # Flat index of the next cell
+    def next_cell(self) -> int:
+        return self.cells[self.size - 1]
+
+    # Another view over the same cells (for a different car)
+    def copy(self) -> "Route":
+        return Route(self.cells, self.positions, self.size)
+
+    def flat(self) -> List[int]:
+        return self.cells[:self.size].tolist()
@@ -0,0 +1,50 @@
+# Route Cache
+# Least recently used cache for the routes cars compute when they are stuck.
+
+# A replan only depends on the position of the car, its destination, which of
+# its neighbors are occupied and how much an occupied cell costs (patience).
+# All of them are part of the key, so when the occupancy around a car changes
+# it simply looks up a different entry: routes computed for another
+# neighborhood are never served, they just age out of the cache.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Tuple
+
+class RouteCache:
+    def __init__(self, size = 4096) -> None:
+        self.size = size
+        self.entries = OrderedDict()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def route(self, key: Hashable, search: Callable) -> List[Tuple[int]]:
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            path = self.entries[key]
+        else:
+            self.misses += 1
+            path = search()
+
+            if self.size > 0:
+                self.entries[key] = path
+                if len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+
+        # Cars pop their route, so each one gets its own view (the cells
+        # are shared)
+        return None if path is None else path.copy()
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
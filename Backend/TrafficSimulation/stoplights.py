@@ -0,0 +1,78 @@
+# Stoplight Engine 🚦
+# Keeps the state of every stoplight in arrays (color, timer, origin) and
+# only touches the lights that change in a given step.
+
+# A light added at tick `origin` changes color at origin + k * timer. Instead
+# of counting every light every step, the engine keeps the ticks in which
+# something changes (a heap) and the lights that change in each of them, so
+# lights with long timers cost nothing in between. The Stoplight agents are
+# views over these arrays.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import heapq
+import numpy as np
+
+from .utilities import Colors
+
+# Colors by value (faster than calling the Enum)
+COLORS = (None,) + tuple(Colors)
+
+class StoplightEngine:
+    def __init__(self) -> None:
+        self.ticks = 0
+
+        self.colors = np.zeros(0, dtype=np.uint8)
+        self.timers = np.zeros(0, dtype=np.int32)
+        self.origins = np.zeros(0, dtype=np.int64)
+
+        # Tick -> lights that change on it, and a heap with those ticks
+        self.pending = dict()
+        self.heap = []
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def schedule(self, tick: int, indices) -> None:
+        if tick not in self.pending:
+            self.pending[tick] = []
+            heapq.heappush(self.heap, tick)
+        self.pending[tick].extend(indices)
+
+    def add(self, state: Colors, timer: int) -> int:
+        index = len(self.colors)
+        self.colors = np.append(self.colors, np.uint8(state.value))
+        self.timers = np.append(self.timers, np.int32(timer))
+        self.origins = np.append(self.origins, self.ticks)
+        self.schedule(self.ticks + timer, (index,))
+        return index
+
+    def state(self, index: int) -> Colors:
+        return COLORS[self.colors[index]]
+
+    def count(self, index: int) -> int:
+        return int((self.ticks - self.origins[index]) % self.timers[index])
+
+    # Changes a single light right away (its timer is not affected)
+    def flip(self, index: int) -> None:
+        self.colors[index] = len(Colors) + 1 - self.colors[index]
+
+    # Advances one step, returns the indices of the lights that changed
+    def advance(self) -> np.ndarray:
+        self.ticks += 1
+
+        if len(self.heap) == 0 or self.heap[0] > self.ticks:
+            return np.zeros(0, dtype=np.int64)
+
+        heapq.heappop(self.heap)
+        changed = np.array(self.pending.pop(self.ticks), dtype=np.int64)
+
+        # GREEN (1) <-> RED (2), all at once
+        self.colors[changed] = len(Colors) + 1 - self.colors[changed]
+
+        timers = self.timers[changed]
+        for timer in np.unique(timers).tolist():
+            self.schedule(self.ticks + timer, changed[timers == timer].tolist())
+
+        return changed
@@ -0,0 +1,71 @@
+# City Template
+# Everything a model needs from its map that never changes: the parsed city,
+# the compiled road graph, the distance fields and the destinations each
+# corner can reach.
+
+# Templates are built once per process and map and shared by every model of
+# that map (nothing in them is written while simulating), so creating a model
+# only costs its agents, its grid and its random number generator.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import os
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from .citymap import CityMap
+from .roadgraph import RoadGraph
+from .pathfinder import GPS
+
+class CityTemplate:
+    # Path, modification time and size of the file -> template
+    templates = dict()
+    lock = Lock()
+
+    def __init__(self, city: CityMap, graph: RoadGraph, fields: Dict[int, List[float]]) -> None:
+        self.city = city
+        self.graph = graph
+        self.fields = fields
+
+        self.corners = [(0, 0), (city.width - 1, 0), (0, city.height - 1), (city.width - 1, city.height - 1)]
+
+        # Destinations that can be reached from each corner (some maps have
+        # corners that lead nowhere, cars are not spawned there)
+        self.reachable: Dict[Tuple[int], List[Tuple[int]]] = {
+            corner: [destination for destination in city.destinations
+                     if fields[graph.index(destination)][graph.index(corner)] < float("inf")]
+            for corner in self.corners
+        }
+
+    @classmethod
+    def load(cls, path: str, cache_dir = None) -> "CityTemplate":
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+        with cls.lock:
+            if key not in cls.templates:
+                cls.templates[key] = cls.build(CityMap.from_file(path, cache_dir), cache_dir)
+            return cls.templates[key]
+
+    # Maps given as objects share a template when they are equal
+    @classmethod
+    def from_map(cls, city: CityMap, cache_dir = None) -> "CityTemplate":
+        key = ("map", city.signature())
+
+        with cls.lock:
+            if key not in cls.templates:
+                cls.templates[key] = cls.build(city, cache_dir)
+            return cls.templates[key]
+
+    @classmethod
+    def build(cls, city: CityMap, cache_dir = None) -> "CityTemplate":
+        gps = GPS(None)
+        gps.graph = RoadGraph.from_city(city)
+        gps.prepare(city.destinations, cache_dir)
+        return cls(city, gps.graph, gps.fields)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls.lock:
+            cls.templates.clear()
@@ -4,4 +4,12 @@ from enum import Enum
 Directions = Enum('Directions', ['UP', 'RIGHT', 'LEFT', 'DOWN'])
 
 # Stoplight Colors
-Colors = Enum('Colors', ['GREEN', 'RED'])
\ No newline at end of file
+Colors = Enum('Colors', ['GREEN', 'RED'])
+
+# Road directions packed as bits (UP = 1, RIGHT = 2, LEFT = 4, DOWN = 8)
+# Used by the compiled road graph instead of tuples of enums
+def direction_mask(directions) -> int:
+    mask = 0
+    for direction in directions:
+        mask |= 1 << (direction.value - 1)
+    return mask
@@ -4,14 +4,45 @@
 # Based on Octavio Navarro's sample
 # https://github.com/octavio-navarro/TC2008B/blob/main/AgentsVisualization/Server/server.py 
 
-# Last Update: 19/Nov/2023
+# Each call to /init creates a new session (a model of its own) and returns
+# its id. The other endpoints take it as the `session` query parameter (or the
+# X-Session header), clients that don't send it use the latest session.
+
+# /update?steps=N runs N steps and returns the state of every one of them. A
+# session created with `prefetch` computes future steps in the background,
+# then /update and /agents read those frames instead of stepping the model.
+
+# /stream steps a session and pushes what changed in each step as Server-Sent
+# Events (see api_container/README.md), with a full keyframe every so often.
+
+# /agents/<type> also has a packed binary layout (see packing.py), served when
+# the request accepts it or has ?format=binary.
+
+# /checkpoint downloads the state of a session, and posting it to /restore
+# creates a new session that continues from there (with ?seed=N, a fork).
+
+# /metrics exports the steps, cars and arrivals of every session (plus phase
+# timers and counters with METRICS=1) in the Prometheus text format.
+
+# Responses of /agents are cached until the model steps and have an ETag, so
+# clients polling more than once per step get a 304. Big responses are
+# gzipped when the client accepts it.
+
+# Last Update: 18/Oct/2026
 # Joaquín Badillo
 
-from flask import Flask, request, jsonify, abort
+from flask import Flask, Response, request, jsonify, abort
 from TrafficSimulation.agents import Car, Stoplight
 from TrafficSimulation.model import TrafficModel
+from TrafficSimulation import checkpoint
+from TrafficSimulation.metrics import prometheus
+from sessions import SessionRegistry, FrameProducer
+import packing
 import argparse
+import gzip
+import json
 import os
+import time
 
 # Global Variables
 
@@ -20,7 +51,9 @@ import os
 agents = {
     "car": {
         "type": Car,
-        "collection": None,
+        "kind": packing.CAR,
+        "arrays": packing.cars,
+        "collection": lambda model: model.agents_by_type[Car].values(),
         "reducer": lambda agent: {
             "id": agent.unique_id, 
             "x": agent.pos[0],
@@ -31,7 +64,9 @@ agents = {
     },
     "stoplight": {
         "type": Stoplight,
-        "collection": None,
+        "kind": packing.STOPLIGHT,
+        "arrays": packing.stoplights,
+        "collection": lambda model: model.agents_by_type[Stoplight].values(),
         "reducer": lambda agent: {
             "id": agent.unique_id,
             "x": agent.pos[0],
@@ -42,10 +77,22 @@ agents = {
     }
 }
 
-model = None
+sessions = SessionRegistry(int(os.environ.get("SESSIONS", 16)), 
+                           float(os.environ.get("SESSION_IDLE", 900)))
 agent_cycle = 10
 post_step = 100
 post_url = None
+prefetch = int(os.environ.get("PREFETCH", 0))
+metrics = os.environ.get("METRICS", "0") == "1"
+
+# Max steps per /update call
+MAX_STEPS = 100
+
+# Steps in between full states in /stream
+KEYFRAME = 50
+
+# Responses bigger than this (bytes) are gzipped, 0 disables it
+gzip_threshold = int(os.environ.get("GZIP_THRESHOLD", 2048))
 
 app = Flask("app")
 
@@ -57,63 +104,251 @@ def page_not_found(e):
 def bad_request(e):
     return jsonify({"message": "Bad request"}), 400
 
+# State of every agent type (and stats) after the current step
+def snapshot(model):
+    frame = {"step": model.num_steps, "cars": model.num_agents}
+
+    for name, agent in agents.items():
+        frame[name] = list(map(agent['reducer'], agent['collection'](model)))
+
+    return frame
+
+# What changed in the last step, as recorded by the model
+def delta(model):
+    changes = model.changes
+    car = agents["car"]['reducer']
+    stoplight = agents["stoplight"]['reducer']
+    spawned = set(agent.unique_id for agent in changes.spawned)
+
+    return {
+        "step": model.num_steps,
+        "cars": model.num_agents,
+        "car": [car(agent) for id, agent in changes.moved.items() if id not in spawned],
+        "spawned": [car(agent) for agent in changes.spawned],
+        "arrived": list(changes.arrived),
+        "removed": list(changes.removed),
+        "stoplight": [stoplight(model.traffic_lights[index]) for index in changes.lights]
+    }
+
+def event(name, frame):
+    return f"id: {frame['step']}\nevent: {name}\ndata: {json.dumps(frame)}\n\n"
+
+def wantsBinary():
+    if request.args.get('format') == 'binary': return True
+    best = request.accept_mimetypes.best_match(['application/json', packing.MIMETYPE])
+    return best == packing.MIMETYPE
+
+def getSession():
+    session_id = request.args.get('session', request.headers.get('X-Session'))
+    session = sessions.get(session_id)
+
+    # Handle bad requests (unknown or evicted session)
+    if session is None: abort(400)
+    return session
+
 @app.route('/init', methods=['POST'])
 def initModel():
-    global model, agent_cycle, post_step, post_url
+    global agent_cycle, post_step, post_url, prefetch, metrics
     if request.method == 'POST':
-        agent_cycle = int(request.form.get('cycles', agent_cycle))
-        model = TrafficModel(agent_cycle=agent_cycle,
+        cycles = int(request.form.get('cycles', agent_cycle))
+        model = TrafficModel(agent_cycle=cycles,
                              post_cycle=post_step,
-                             self_url=post_url)
-        agents["car"]["collection"] = lambda: model.schedule.agents
-        agents["stoplight"]["collection"] = lambda: model.traffic_lights
+                             self_url=post_url,
+                             metrics=metrics)
+        session = sessions.create(model)
+
+        buffer = int(request.form.get('prefetch', prefetch))
+        if buffer > 0:
+            session.frame = snapshot(model)
+            session.producer = FrameProducer(session, snapshot, buffer)
+            session.producer.start()
         
-        return jsonify({"message": "Model Initialized"})
+        return jsonify({"message": "Model Initialized", "session": session.id})
 
 @app.route('/agents/<agentType>', methods=['GET'])
 def getAgents(agentType):
-    global model, agents
-    agentType == request.view_args['agentType']
+    global agents
 
     if request.method == 'GET':
         # Handle bad requests
-        if model is None: abort(400)
         if agentType not in agents: abort(400)
+        session = getSession()
 
-        datatype = agents[agentType]['type']
+        kind = agents[agentType]['kind']
         reducer = agents[agentType]['reducer']
         collect = agents[agentType]['collection']
 
-        data = map(
-            reducer,
-            [agent for agent in collect() if isinstance(agent, datatype)]
-        )
+        binary = wantsBinary()
+        compress = (gzip_threshold > 0 and 
+                    'gzip' in request.accept_encodings)
+
+        # Precomputed frames are ahead of the model, serve the one in use
+        frame = session.frame if session.producer is not None else None
+
+        def build():
+            if binary and frame is not None:
+                data = packing.pack(kind, frame["step"], *packing.records(kind, frame[agentType]))
+            elif binary:
+                data = packing.pack(kind, session.model.num_steps, *agents[agentType]['arrays'](session.model))
+            elif frame is not None:
+                data = app.json.dumps({'data': frame[agentType]}).encode()
+            else:
+                data = app.json.dumps({'data': list(map(reducer, collect(session.model)))}).encode()
+
+            if compress and len(data) > gzip_threshold:
+                return gzip.compress(data, compresslevel=5), 'gzip'
+            return data, None
+
+        def respond(step):
+            etag = f'{session.id}-{step}-{agentType}{"-bin" if binary else ""}{"-gz" if compress else ""}'
+
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                data, encoding = session.cached(step, (agentType, binary, compress), build)
+                response = Response(data, mimetype=packing.MIMETYPE if binary else 'application/json')
+                if encoding is not None: response.headers['Content-Encoding'] = encoding
+
+            response.set_etag(etag)
+            return response
+
+        # Frames don't need the model, only the cache lock of the session, so
+        # they are served while the producer steps
+        if frame is not None:
+            response = respond(frame["step"])
+        else:
+            with session.lock:
+                response = respond(session.model.num_steps)
 
-        return jsonify({'data': list(data)})
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        return response
 
 @app.route('/stats', methods=['GET'])
 def getStats():
-    global model
     if request.method == 'GET':
+        session = getSession()
         stats = {
             "year": 2023,
             "group": 301,
             "team": 5,
-            "cars": model.num_agents,
+            "cars": session.model.num_agents if session.producer is None 
+                    else session.frame["cars"],
         }
 
         return jsonify({'stats':stats})
 
 @app.route('/update', methods=['GET'])
 def updateModel():
-    global model
     if request.method == 'GET':
-        model.step()
-        return jsonify({
+        session = getSession()
+        steps = request.args.get('steps', type=int)
+        count = 1 if steps is None else max(1, min(steps, MAX_STEPS))
+
+        if session.producer is not None:
+            frames = session.producer.take(count)
+            if len(frames) > 0: session.frame = frames[-1]
+            step = session.frame["step"]
+        else:
+            frames = []
+            with session.lock:
+                for _ in range(count):
+                    session.model.step()
+                    if steps is not None: frames.append(snapshot(session.model))
+                step = session.model.num_steps
+
+        response = {
             'message': 'Model updated.', 
-            'currentStep': model.num_steps
+            'currentStep': step
+        }
+
+        # Only clients that asked for a number of steps get the frames
+        if steps is not None: response['frames'] = frames
+
+        return jsonify(response)
+
+@app.route('/checkpoint', methods=['GET'])
+def getCheckpoint():
+    if request.method == 'GET':
+        session = getSession()
+
+        # The producer is ahead of what the client has seen
+        if session.producer is not None: abort(400)
+
+        with session.lock:
+            step = session.model.num_steps
+            data = checkpoint.dumps(session.model.checkpoint())
+
+        return Response(data, mimetype='application/gzip', headers={
+            'Content-Disposition': f'attachment; filename=checkpoint_{step}.json.gz'
         })
 
+@app.route('/restore', methods=['POST'])
+def restoreModel():
+    if request.method == 'POST':
+        try:
+            state = checkpoint.loads(request.get_data())
+            params = {'post_cycle': post_step, 'self_url': post_url, 'metrics': metrics}
+            if 'cycles' in request.args: params['agent_cycle'] = int(request.args['cycles'])
+
+            # Always the city of the server (the checkpoint must match it)
+            model = TrafficModel.restore(state, 
+                                         seed=request.args.get('seed', type=int),
+                                         city_file=None,
+                                         **params)
+        except (OSError, ValueError, KeyError, TypeError):
+            abort(400)
+
+        session = sessions.create(model)
+        return jsonify({"message": "Model Restored", "session": session.id, "currentStep": model.num_steps})
+
+@app.route('/metrics', methods=['GET'])
+def getMetrics():
+    if request.method == 'GET':
+        models = {session.id: session.model for session in sessions.snapshot()}
+        data = f"# HELP duckcity_sessions Active sessions.\n# TYPE duckcity_sessions gauge\nduckcity_sessions {len(models)}\n"
+        data += prometheus(models)
+
+        return Response(data, mimetype='text/plain; version=0.0.4')
+
+@app.route('/stream', methods=['GET'])
+def streamModel():
+    if request.method == 'GET':
+        session = getSession()
+
+        # The producer is already stepping the model
+        if session.producer is not None: abort(400)
+
+        steps = request.args.get('steps', type=int)
+        keyframe = max(1, request.args.get('keyframe', KEYFRAME, type=int))
+        interval = max(0.0, request.args.get('interval', 0.0, type=float))
+
+        def generate():
+            with session.lock:
+                frame = snapshot(session.model)
+            yield event("keyframe", frame)
+
+            count = 0
+            while steps is None or count < steps:
+                with session.lock:
+                    model = session.model
+                    if not model.running: break
+
+                    model.step()
+                    session.touch()
+                    if model.num_steps % keyframe == 0:
+                        name, frame = "keyframe", snapshot(model)
+                    else:
+                        name, frame = "delta", delta(model)
+
+                yield event(name, frame)
+                count += 1
+                if interval > 0: time.sleep(interval)
+
+            yield "event: end\ndata: {}\n\n"
+
+        return Response(generate(), mimetype='text/event-stream', 
+                        headers={'Cache-Control': 'no-cache'})
+
 if __name__ == '__main__':
     env = os.environ
     
@@ -121,11 +356,20 @@ if __name__ == '__main__':
     parser.add_argument('--cycles', type=int, default=int(env.get("AGENT_CYCLE", 10)), help='Number of cycles in between agent spawners.')
     parser.add_argument('--post_step', type=int, default=int(env.get("POST_STEP", 100)), help='Number of steps in between posts.')
     parser.add_argument('--url', type=str, default=env.get("URL", None), help='Server URL for competition.')
+    parser.add_argument('--prefetch', type=int, default=int(env.get("PREFETCH", 0)), help='Steps computed ahead in the background per session (0 disables it).')
+    parser.add_argument('--gzip', type=int, default=int(env.get("GZIP_THRESHOLD", 2048)), help='Min size (bytes) of gzipped /agents responses (0 disables it).')
+    parser.add_argument('--metrics', action='store_true', default=env.get("METRICS", "0") == "1", help='Measure phase timers and counters of every model (see /metrics).')
+    parser.add_argument('--sessions', type=int, default=int(env.get("SESSIONS", 16)), help='Max number of simultaneous sessions.')
+    parser.add_argument('--idle', type=float, default=float(env.get("SESSION_IDLE", 900)), help='Seconds before an idle session is evicted.')
     args = parser.parse_args()
-    if (agent_cycle := args.cycle) <= 1:
+    if (agent_cycle := args.cycles) <= 1:
         raise ValueError("Agent cycle must be greater than 1")
     if (post_step := args.post_step) <= 1:
         raise ValueError("Post step must be greater than 1")
     post_url = args.url
+    prefetch = args.prefetch
+    metrics = args.metrics
+    gzip_threshold = args.gzip
+    sessions = SessionRegistry(args.sessions, args.idle)
 
     app.run(port="8080", debug=True)
@@ -0,0 +1,211 @@
+# TC2008B - Modeling of Multi-Agent Systems with Computer Graphics
+# ASGI (Starlette) server to interact with Unity, same contract as app.py.
+
+# Run it with uvicorn: `python asgi.py` or `uvicorn asgi:app --port 8080`
+
+# Every session publishes a frame (the state after its last step). Reads
+# (/agents and /stats) are served from that frame and never wait on the
+# model, while /init and /update build and step models in worker threads.
+# ETags, binary snapshots and prefetching work as in app.py.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from urllib.parse import parse_qsl
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from TrafficSimulation.model import TrafficModel
+from sessions import SessionRegistry, FrameProducer
+from app import agents, snapshot, MAX_STEPS
+import packing
+import argparse
+import json
+import os
+
+# Global Variables
+sessions = SessionRegistry(int(os.environ.get("SESSIONS", 16)),
+                           float(os.environ.get("SESSION_IDLE", 900)))
+agent_cycle = int(os.environ.get("AGENT_CYCLE", 10))
+post_step = int(os.environ.get("POST_STEP", 100))
+post_url = os.environ.get("URL", None)
+prefetch = int(os.environ.get("PREFETCH", 0))
+gzip_threshold = int(os.environ.get("GZIP_THRESHOLD", 2048))
+
+async def not_found(request, e):
+    return JSONResponse({"message": "Resource not found"}, 404)
+
+async def bad_request(request, e):
+    return JSONResponse({"message": "Bad request"}, 400)
+
+def getSession(request):
+    session_id = request.query_params.get('session', request.headers.get('X-Session'))
+    session = sessions.get(session_id)
+
+    # Handle bad requests (unknown or evicted session)
+    if session is None: raise HTTPException(400)
+    return session
+
+def wantsBinary(request):
+    if request.query_params.get('format') == 'binary': return True
+    accept = parse_accept_header(request.headers.get('Accept'), MIMEAccept)
+    return accept.best_match(['application/json', packing.MIMETYPE]) == packing.MIMETYPE
+
+def encode(data) -> bytes:
+    # Same format as Flask's jsonify
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+
+# Runs in a worker thread, publishes the new frame when it is done
+def advance(session, count, keep):
+    frames = []
+    with session.lock:
+        model = session.model
+        for _ in range(count):
+            model.step()
+            if keep: frames.append(snapshot(model))
+
+        session.frame = frames[-1] if keep else snapshot(model)
+    return frames
+
+async def initModel(request):
+    form = dict(parse_qsl((await request.body()).decode()))
+    cycles = int(form.get('cycles', agent_cycle))
+
+    model = await run_in_threadpool(TrafficModel,
+                                    agent_cycle=cycles,
+                                    post_cycle=post_step,
+                                    self_url=post_url)
+    session = sessions.create(model)
+    session.frame = snapshot(model)
+
+    buffer = int(form.get('prefetch', prefetch))
+    if buffer > 0:
+        session.producer = FrameProducer(session, snapshot, buffer)
+        session.producer.start()
+
+    return JSONResponse({"message": "Model Initialized", "session": session.id})
+
+async def getAgents(request):
+    agentType = request.path_params['agentType']
+
+    # Handle bad requests
+    if agentType not in agents: raise HTTPException(400)
+    session = getSession(request)
+
+    frame = session.frame
+    step = frame["step"]
+    kind = agents[agentType]['kind']
+    binary = wantsBinary(request)
+
+    # GZipMiddleware compresses the response, the ETag changes with it
+    compress = (gzip_threshold > 0 and
+                'gzip' in request.headers.get('Accept-Encoding', ''))
+
+    etag = f'"{session.id}-{step}-{agentType}{"-bin" if binary else ""}{"-gz" if compress else ""}"'
+    headers = {'ETag': etag, 'Vary': 'Accept, Accept-Encoding'}
+
+    matches = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+    if etag in matches: return Response(status_code=304, headers=headers)
+
+    def build():
+        if binary:
+            return packing.pack(kind, step, *packing.records(kind, frame[agentType]))
+        return encode({'data': frame[agentType]})
+
+    # Serializing is done once per step, out of the event loop (frames don't
+    # need the model lock, only the cache lock of the session)
+    key = (agentType, binary)
+    cached = session.responses.get(key)
+    data = cached[1] if cached is not None and cached[0] == step else None
+    if data is None:
+        data = await run_in_threadpool(session.cached, step, key, build)
+
+    return Response(data, headers=headers,
+                    media_type=packing.MIMETYPE if binary else 'application/json')
+
+async def getStats(request):
+    session = getSession(request)
+    stats = {
+        "year": 2023,
+        "group": 301,
+        "team": 5,
+        "cars": session.frame["cars"],
+    }
+
+    return JSONResponse({'stats': stats})
+
+async def updateModel(request):
+    session = getSession(request)
+    steps = request.query_params.get('steps')
+
+    # Like app.py, anything that is not a number is a single step
+    try:
+        steps = None if steps is None else int(steps)
+    except ValueError:
+        steps = None
+    count = 1 if steps is None else max(1, min(steps, MAX_STEPS))
+
+    if session.producer is not None:
+        frames = await run_in_threadpool(session.producer.take, count)
+        if len(frames) > 0: session.frame = frames[-1]
+    else:
+        frames = await run_in_threadpool(advance, session, count, steps is not None)
+
+    response = {
+        'message': 'Model updated.',
+        'currentStep': session.frame["step"]
+    }
+
+    # Only clients that asked for a number of steps get the frames
+    if steps is not None: response['frames'] = frames
+
+    return Response(encode(response), media_type='application/json')
+
+def create():
+    middleware = []
+    if gzip_threshold > 0:
+        middleware.append(Middleware(GZipMiddleware, minimum_size=gzip_threshold))
+
+    return Starlette(
+        routes=[
+            Route('/init', initModel, methods=['POST']),
+            Route('/agents/{agentType}', getAgents, methods=['GET']),
+            Route('/stats', getStats, methods=['GET']),
+            Route('/update', updateModel, methods=['GET']),
+        ],
+        middleware=middleware,
+        exception_handlers={404: not_found, 400: bad_request}
+    )
+
+app = create()
+
+if __name__ == '__main__':
+    import uvicorn
+    env = os.environ
+
+    parser = argparse.ArgumentParser(description='Run the ASGI server.')
+    parser.add_argument('--cycles', type=int, default=agent_cycle, help='Number of cycles in between agent spawners.')
+    parser.add_argument('--post_step', type=int, default=post_step, help='Number of steps in between posts.')
+    parser.add_argument('--url', type=str, default=post_url, help='Server URL for competition.')
+    parser.add_argument('--prefetch', type=int, default=prefetch, help='Steps computed ahead in the background per session (0 disables it).')
+    parser.add_argument('--gzip', type=int, default=gzip_threshold, help='Min size (bytes) of gzipped responses (0 disables it).')
+    parser.add_argument('--sessions', type=int, default=int(env.get("SESSIONS", 16)), help='Max number of simultaneous sessions.')
+    parser.add_argument('--idle', type=float, default=float(env.get("SESSION_IDLE", 900)), help='Seconds before an idle session is evicted.')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on.')
+    args = parser.parse_args()
+    if (agent_cycle := args.cycles) <= 1:
+        raise ValueError("Agent cycle must be greater than 1")
+    if (post_step := args.post_step) <= 1:
+        raise ValueError("Post step must be greater than 1")
+    post_url = args.url
+    prefetch = args.prefetch
+    gzip_threshold = args.gzip
+    sessions = SessionRegistry(args.sessions, args.idle)
+
+    uvicorn.run(create(), host="0.0.0.0", port=args.port)
@@ -0,0 +1,73 @@
+# City generator
+# Builds city files of any size in the format of city_files/*.txt: a grid of
+# square blocks surrounded by two lane streets (one lane each way), with
+# stoplights before the intersections and one destination per block.
+
+# Usage (from Backend): python -m benchmarks.citygen --blocks 8 --size 6 > big.txt
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from typing import List
+import argparse
+import random
+
+# Intersection of a vertical lane (down, up) and a horizontal lane (left, right)
+CROSSINGS = {
+    ("v", "<"): "[", ("v", ">"): "]",
+    ("^", "<"): "{", ("^", ">"): "}",
+}
+
+def generate(blocks = 4, size = 6, seed = 0, lights = True, destinations = None) -> List[str]:
+    rng = random.Random(seed)
+    side = blocks * (size + 2) + 2
+
+    # Streets take two rows/columns every size + 2 cells (text rows go down)
+    lane = lambda i: (i % (size + 2)) if i % (size + 2) < 2 else None
+    vertical = ["v" if lane(x) == 0 else "^" if lane(x) == 1 else None for x in range(side)]
+    horizontal = ["<" if lane(y) == 0 else ">" if lane(y) == 1 else None for y in range(side)]
+
+    rows = []
+    for y in range(side):
+        row = []
+        for x in range(side):
+            if vertical[x] and horizontal[y]:
+                row.append(CROSSINGS[(vertical[x], horizontal[y])])
+            else:
+                row.append(vertical[x] or horizontal[y] or "#")
+        rows.append(row)
+
+    # Stoplights on the cell before each intersection, horizontal lanes start
+    # green and vertical lanes red
+    if lights:
+        for y in range(side):
+            for x in range(side):
+                if rows[y][x] == "<" and x > 0 and vertical[x - 1]: rows[y][x] = "h"
+                elif rows[y][x] == ">" and x + 1 < side and vertical[x + 1]: rows[y][x] = "H"
+                elif rows[y][x] == "v" and y + 1 < side and horizontal[y + 1]: rows[y][x] = "y"
+                elif rows[y][x] == "^" and y > 0 and horizontal[y - 1]: rows[y][x] = "Y"
+
+    # A destination on the border of every block (or of some of them, big
+    # cities with a destination per block have too many distance fields)
+    chosen = [(by, bx) for by in range(blocks) for bx in range(blocks)]
+    if destinations is not None:
+        chosen = rng.sample(chosen, min(destinations, len(chosen)))
+
+    for by, bx in chosen:
+        top, left = by * (size + 2) + 2, bx * (size + 2) + 2
+        border = [(top, left + i) for i in range(size)] + [(top + size - 1, left + i) for i in range(size)]
+        border += [(top + i, left) for i in range(size)] + [(top + i, left + size - 1) for i in range(size)]
+        y, x = rng.choice(border)
+        rows[y][x] = "D"
+
+    return ["".join(row) for row in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a city file.')
+    parser.add_argument('--blocks', type=int, default=4, help='Blocks per side.')
+    parser.add_argument('--size', type=int, default=6, help='Cells per side of a block.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the destinations.')
+    parser.add_argument('--destinations', type=int, default=None, help='Blocks with a destination (all by default).')
+    args = parser.parse_args()
+
+    print("\n".join(generate(args.blocks, args.size, args.seed, destinations=args.destinations)))
@@ -0,0 +1,63 @@
+# Statistical equivalence of activation modes
+# Runs the same seeds with RandomActivation and another activation mode on
+# every shipped city file and compares arrivals and cars on the road with
+# Welch's t statistic. Exits with an error if any pair looks different.
+
+# Usage (from Backend): python -m benchmarks.equivalence --mode synchronous
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from TrafficSimulation.model import TrafficModel
+from statistics import mean, stdev
+import argparse
+import glob
+import os
+import sys
+
+CITY_FILES = sorted(glob.glob(f'{os.path.dirname(__file__)}/../TrafficSimulation/city_files/*.txt'))
+
+def simulate(city_file, activation, agent_cycle, steps, seed):
+    model = TrafficModel(city_file=city_file,
+                         agent_cycle=agent_cycle,
+                         limit=steps + 1,
+                         activation=activation,
+                         seed=seed)
+    for _ in range(steps):
+        model.step()
+    return model.num_arrivals, model.num_agents
+
+def welch(a, b) -> float:
+    variance = stdev(a) ** 2 / len(a) + stdev(b) ** 2 / len(b)
+    if variance == 0: return 0.0 if mean(a) == mean(b) else float("inf")
+    return (mean(a) - mean(b)) / variance ** 0.5
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare an activation mode against RandomActivation.')
+    parser.add_argument('--mode', type=str, default="synchronous", choices=["event", "synchronous"], help='Activation mode to compare.')
+    parser.add_argument('--cycles', type=int, nargs="+", default=[10, 3], help='Spawn cycles to test.')
+    parser.add_argument('--steps', type=int, default=300, help='Steps per run.')
+    parser.add_argument('--seeds', type=int, default=12, help='Runs per configuration.')
+    parser.add_argument('--threshold', type=float, default=3.0, help='Max absolute t statistic.')
+    args = parser.parse_args()
+
+    failed = False
+    print("city cycles metric random mode t")
+
+    for city_file in CITY_FILES:
+        for cycles in args.cycles:
+            runs = {
+                activation: [simulate(city_file, activation, cycles, args.steps, seed) 
+                             for seed in range(args.seeds)]
+                for activation in ("random", args.mode)
+            }
+
+            for k, metric in enumerate(("arrivals", "cars")):
+                a = [run[k] for run in runs["random"]]
+                b = [run[k] for run in runs[args.mode]]
+                t = welch(a, b)
+                failed = failed or abs(t) > args.threshold
+                print(os.path.basename(city_file), cycles, metric, 
+                      f"{mean(a):.1f}", f"{mean(b):.1f}", f"{t:.2f}")
+
+    sys.exit(1 if failed else 0)
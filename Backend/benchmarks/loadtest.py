@@ -0,0 +1,99 @@
+# API load test
+# Starts the Flask (app.py) and ASGI (asgi.py) servers, and has a number of
+# clients poll each of them like the Unity visualizer does: /update, then
+# /agents/car, /agents/stoplight and /stats. Reports requests per second and
+# latency percentiles per server.
+
+# Usage (from Backend): python -m benchmarks.loadtest --clients 8 --seconds 20
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from threading import Thread
+from time import perf_counter, sleep
+import argparse
+import os
+import subprocess
+import sys
+
+import numpy as np
+import requests
+
+BACKEND = os.path.join(os.path.dirname(__file__), '..')
+
+SERVERS = {
+    "flask": lambda port: [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port)],
+    "asgi": lambda port: [sys.executable, "asgi.py", "--port", str(port)],
+}
+
+def wait(url, timeout = 30.0) -> None:
+    start = perf_counter()
+    while perf_counter() - start < timeout:
+        try:
+            requests.get(url + "/stats", timeout=1)
+            return
+        except requests.ConnectionError:
+            sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+# Polls until the deadline, appends the latency of every request
+def client(url, cycles, deadline, polls, latencies, errors) -> None:
+    http = requests.Session()
+    session = http.post(url + "/init", data={"cycles": cycles}).json()["session"]
+    params = {"session": session}
+
+    while perf_counter() < deadline:
+        for endpoint in ["/update"] + ["/agents/car", "/agents/stoplight", "/stats"] * polls:
+            start = perf_counter()
+            try:
+                response = http.get(url + endpoint, params=params, timeout=30)
+                if response.status_code >= 400: errors.append(response.status_code)
+            except requests.RequestException:
+                errors.append(endpoint)
+            latencies.append(perf_counter() - start)
+
+def run(name, port, args) -> dict:
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, SESSIONS=str(args.clients + 1))
+    server = subprocess.Popen(SERVERS[name](port), cwd=BACKEND, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait(url)
+        latencies, errors = [], []
+        deadline = perf_counter() + args.seconds
+        clients = [Thread(target=client, args=(url, args.cycles, deadline, args.polls, latencies, errors))
+                   for _ in range(args.clients)]
+
+        start = perf_counter()
+        for thread in clients: thread.start()
+        for thread in clients: thread.join()
+        elapsed = perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "server": name,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50": np.percentile(latencies, 50),
+        "p99": np.percentile(latencies, 99),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the Flask and ASGI servers.')
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS), help='Servers to test.')
+    parser.add_argument('--clients', type=int, default=8, help='Number of simultaneous clients.')
+    parser.add_argument('--seconds', type=float, default=20, help='Duration of the test per server.')
+    parser.add_argument('--polls', type=int, default=1, help='Reads of every endpoint per /update.')
+    parser.add_argument('--cycles', type=int, default=2, help='Agent cycle of the simulations.')
+    parser.add_argument('--port', type=int, default=8090, help='First port used by the servers.')
+    args = parser.parse_args()
+
+    print(f"{'server':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for i, name in enumerate(args.servers):
+        result = run(name, args.port + i, args)
+        print(f"{result['server']:>8} {result['requests']:>9} {result['errors']:>7} "
+              f"{result['rps']:>9.1f} {result['p50']:>9.2f} {result['p99']:>9.2f}")
@@ -0,0 +1,143 @@
+# Memory benchmark
+# Measures with tracemalloc how much memory the map layers take (parsed city,
+# road graph, distance fields) and how much every car adds, placing many
+# more cars than the spawner would (one per free road cell that leads to a
+# destination, with static routes like spawned cars). The default city is a
+# generated one with room for more than 100k cars (and only 4 destinations,
+# so the distance fields fit in memory).
+
+# Memory is grouped by the module that allocated it, so route storage
+# (pathfinder/route), car objects (agents/model), the grid (space) and the
+# schedule (time/activation) are reported separately. The run fails when the
+# bytes per car of the different populations differ by more than the
+# tolerance (memory should grow linearly with the cars).
+
+# Usage (from Backend): python -m benchmarks.memory --cars 1000 10000 100000
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from TrafficSimulation.model import TrafficModel
+from TrafficSimulation.template import CityTemplate
+from benchmarks.citygen import generate
+from collections import defaultdict
+from time import perf_counter
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+# Modules -> what they allocate
+GROUPS = {
+    "citymap.py": "city",
+    "roadgraph.py": "graph",
+    "pathfinder.py": "routes",
+    "route.py": "routes",
+    "space.py": "grid",
+    "time.py": "schedule",
+    "activation.py": "schedule",
+    "agents.py": "cars",
+    "model.py": "cars",
+}
+
+# Bytes allocated since the snapshot, by group (cars that are no longer
+# referenced are collected first)
+def usage(snapshot) -> dict:
+    gc.collect()
+    groups = defaultdict(int)
+    for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename"):
+        groups[GROUPS.get(os.path.basename(stat.traceback[0].filename), "other")] += stat.size_diff
+    return groups
+
+def populate(model, count, rng) -> None:
+    gps = model.gps
+
+    # Free road cells and the destinations they lead to
+    starts = []
+    for cell in gps.graph.cells:
+        if not model.city.is_road(cell) or model.occupied(cell): continue
+        reachable = [destination for destination in model.destinations
+                     if destination != cell and gps.distance(cell, destination) < float("inf")]
+        if len(reachable) > 0: starts.append((cell, reachable))
+    # One car per cell, like the simulation
+    if count > len(starts):
+        raise ValueError(f"{count} cars don't fit in the {len(starts)} free road cells of the city")
+
+    for cell, reachable in rng.sample(starts, count):
+        model.add_car(cell, rng.choice(reachable))
+
+def measure(city_file, counts, seed, steps = 0) -> dict:
+    CityTemplate.clear()
+    tracemalloc.start()
+
+    snapshot = tracemalloc.take_snapshot()
+    CityTemplate.load(city_file)
+    result = {"map": usage(snapshot), "cars": {}}
+
+    for count in counts:
+        model = TrafficModel(city_file=city_file, seed=seed)
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        start = perf_counter()
+        populate(model, count, random.Random(seed))
+        elapsed = perf_counter() - start
+
+        groups = usage(snapshot)
+        result["cars"][count] = {
+            "total": sum(groups.values()),
+            "groups": dict(groups),
+            "seconds": elapsed,
+        }
+
+        if steps > 0:
+            tracemalloc.reset_peak()
+            start = perf_counter()
+            for _ in range(steps):
+                model.step()
+            result["cars"][count]["step_seconds"] = (perf_counter() - start) / steps
+            result["cars"][count]["step_peak"] = tracemalloc.get_traced_memory()[1]
+
+        del model
+
+    tracemalloc.stop()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure the memory of the map and of every car.')
+    parser.add_argument('--cars', type=int, nargs="+", default=[1000, 10000, 100000], help='Populations to measure.')
+    parser.add_argument('--city', type=str, default=None, help='City file (a generated 64x6 blocks city by default).')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the model and the placement.')
+    parser.add_argument('--steps', type=int, default=0, help='Steps to run with each population.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Max relative difference of the bytes per car.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        city_file = args.city
+        if city_file is None:
+            city_file = os.path.join(directory, "generated_64x6.txt")
+            with open(city_file, "w") as city:
+                city.write("\n".join(generate(64, 6, seed=0, destinations=4)))
+
+        try:
+            result = measure(city_file, args.cars, args.seed, args.steps)
+        except ValueError as e:
+            parser.error(str(e))
+
+    print("map", " ".join(f"{name}={size / 2**20:.2f}MB" for name, size in sorted(result["map"].items())),
+          f"total={sum(result['map'].values()) / 2**20:.2f}MB")
+
+    per_car = []
+    print("cars total_mb bytes/car routes/car cars/car grid/car schedule/car populate_s step_s")
+    for count, cars in result["cars"].items():
+        per = lambda name: cars["groups"].get(name, 0) / count
+        per_car.append(cars["total"] / count)
+        print(count, f"{cars['total'] / 2**20:.2f}", f"{per_car[-1]:.0f}", f"{per('routes'):.0f}",
+              f"{per('cars'):.0f}", f"{per('grid'):.0f}", f"{per('schedule'):.0f}",
+              f"{cars['seconds']:.2f}", f"{cars.get('step_seconds', float('nan')):.3f}")
+
+    spread = max(per_car) / min(per_car) - 1
+    print(f"bytes per car spread: {spread:.1%}")
+    sys.exit(1 if spread > args.tolerance else 0)
@@ -0,0 +1,75 @@
+# Move check
+# Runs every shipped city file with the replanning budgets, planners and
+# activation modes, and checks that every move of every car goes to a cell
+# next to it that it is allowed to enter (GPS.valid). Exits with an error
+# if any car jumped.
+
+# Usage (from Backend): python -m benchmarks.moves --seeds 3 --steps 300
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from TrafficSimulation.model import TrafficModel
+from TrafficSimulation.agents import Car
+from benchmarks.pathfinding import moves
+import argparse
+import glob
+import os
+import sys
+
+CITY_FILES = sorted(glob.glob(f'{os.path.dirname(__file__)}/../TrafficSimulation/city_files/*.txt'))
+
+CONFIGS = [
+    {},
+    {"replan_budget": 1},
+    {"replan_budget": 5},
+    {"replan_time_budget": 1e-4},
+    {"planner": "dstar"},
+    {"activation": "event"},
+    {"activation": "synchronous"},
+    {"activation": "synchronous", "replan_budget": 1},
+]
+
+# Illegal moves of a run as (step, car, from, to)
+def simulate(city_file, config, agent_cycle, steps, seed) -> list:
+    model = TrafficModel(city_file=city_file, agent_cycle=agent_cycle, limit=steps + 1, seed=seed, **config)
+    gps, grid = model.gps, model.grid
+    illegal = []
+
+    # Every move of the cars goes through the grid
+    move_agent = grid.move_agent
+    def checked(agent, pos) -> None:
+        if isinstance(agent, Car):
+            dx, dy = pos[0] - agent.pos[0], pos[1] - agent.pos[1]
+            if max(abs(dx), abs(dy)) != 1 or not gps.valid(*pos, moves(dx, dy), agent.destination):
+                illegal.append((model.num_steps, agent.unique_id, agent.pos, pos))
+        move_agent(agent, pos)
+    grid.move_agent = checked
+
+    for _ in range(steps):
+        model.step()
+
+    return illegal
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check that cars only move to neighboring cells.')
+    parser.add_argument('--cycles', type=int, nargs="+", default=[10, 2], help='Spawn cycles to test.')
+    parser.add_argument('--steps', type=int, default=300, help='Steps per run.')
+    parser.add_argument('--seeds', type=int, default=3, help='Runs per configuration.')
+    args = parser.parse_args()
+
+    failed = False
+    print("city cycles config illegal_moves")
+
+    for city_file in CITY_FILES:
+        for cycles in args.cycles:
+            for config in CONFIGS:
+                illegal = [move for seed in range(1, args.seeds + 1)
+                           for move in simulate(city_file, config, cycles, args.steps, seed)]
+                failed = failed or len(illegal) > 0
+                print(os.path.basename(city_file), cycles, config, len(illegal))
+
+                for move in illegal[:3]:
+                    print("   ", *move)
+
+    sys.exit(1 if failed else 0)
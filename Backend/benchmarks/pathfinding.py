@@ -0,0 +1,206 @@
+# Pathfinding benchmark and oracle
+# Samples (start, destination, obstacles) queries over the roads of every
+# city file and runs them through GPS.astar (the reference) and the other
+# route engines. Every route must be legal (each move allowed by GPS.valid,
+# ending at the destination) and cost exactly as much as the reference one.
+# Reports latency percentiles and expanded nodes per engine, and exits with
+# an error if any engine returns a wrong route.
+
+# Obstacles are like the ones of a replan: occupied cells that cost more
+# (the patience of the car decides how much), mostly around the start.
+
+# Usage (from Backend): python -m benchmarks.pathfinding --queries 500
+# Other engines: --engine mymodule:factory (factory(gps) returns a function
+# (start, goal, obstacles, obstacle_cost) -> route like GPS.astar)
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from TrafficSimulation.model import TrafficModel
+from TrafficSimulation.dstarlite import DStarLite
+from TrafficSimulation.utilities import Directions
+from time import perf_counter
+import argparse
+import glob
+import importlib
+import os
+import random
+import sys
+
+import numpy as np
+
+CITY_FILES = sorted(glob.glob(f'{os.path.dirname(__file__)}/../TrafficSimulation/city_files/*.txt'))
+
+# Cost of moving into a cell, like Car.calculate_route
+def cost_function(gps, obstacles, obstacle_cost):
+    return lambda start, neighbor: obstacle_cost if neighbor in obstacles else gps.euclidean_distance(start, neighbor)
+
+# -- Engines --
+# Each one returns the route (reversed, without the start) and the nodes it
+# expanded, or None when there is no route. Engines that can't handle a
+# query return False (it is skipped).
+
+def reference(gps):
+    def search(start, goal, obstacles, obstacle_cost):
+        expanded = gps.expanded
+        path = gps.astar(start, goal, cost=cost_function(gps, obstacles, obstacle_cost))
+        return path, gps.expanded - expanded
+    return search
+
+def manhattan(gps):
+    def search(start, goal, obstacles, obstacle_cost):
+        expanded = gps.expanded
+        path = gps.astar(start, goal, cost=cost_function(gps, obstacles, obstacle_cost),
+                         heuristic=gps.manhattan_distance)
+        return path, gps.expanded - expanded
+    return search
+
+def dstar(gps):
+    # One planner per destination, repaired between queries like a car does
+    planners = {}
+
+    def search(start, goal, obstacles, obstacle_cost):
+        if goal not in planners: planners[goal] = DStarLite(gps, goal)
+        planner = planners[goal]
+        expanded = planner.expanded
+        path = planner.plan(start, obstacles, obstacle_cost)
+        return path, planner.expanded - expanded
+    return search
+
+def gradient(gps):
+    # Static routes only (no obstacles)
+    def search(start, goal, obstacles, obstacle_cost):
+        if len(obstacles) > 0: return False
+        return gps.route(start, goal), 0
+    return search
+
+ENGINES = {
+    "astar": reference,
+    "astar_manhattan": manhattan,
+    "dstar": dstar,
+    "gradient": gradient,
+}
+
+# -- Oracle --
+
+def moves(dx, dy):
+    directions = []
+    if dy == 1: directions.append(Directions.UP)
+    if dy == -1: directions.append(Directions.DOWN)
+    if dx == 1: directions.append(Directions.RIGHT)
+    if dx == -1: directions.append(Directions.LEFT)
+    return tuple(directions)
+
+# Reason why the route is illegal (None if it is legal)
+def illegal(gps, start, goal, path):
+    if len(path) == 0: return None if start == goal else "empty route"
+    if path[0] != goal: return "does not end at the destination"
+
+    previous = start
+    for x, y in reversed(path):
+        dx, dy = x - previous[0], y - previous[1]
+        if max(abs(dx), abs(dy)) != 1: return f"jump {previous} -> {(x, y)}"
+        if not gps.valid(x, y, moves(dx, dy), goal): return f"invalid move {previous} -> {(x, y)}"
+        previous = (x, y)
+
+    return None
+
+def path_cost(gps, start, path, obstacles, obstacle_cost):
+    cost = cost_function(gps, obstacles, obstacle_cost)
+    total, previous = 0, start
+    for cell in reversed(path):
+        total += cost(previous, cell)
+        previous = cell
+    return total
+
+def queries(model, count, rng):
+    city = model.city
+    roads = [cell for cell in model.gps.graph.cells if city.is_road(cell)]
+
+    for _ in range(count):
+        start = rng.choice(roads)
+        goal = rng.choice(model.destinations)
+
+        # Occupied neighbors (what a stuck car sees) and some cars around
+        neighborhood = model.grid.get_neighborhood(start, moore=False, include_center=False)
+        obstacles = set(cell for cell in neighborhood if city.is_road(cell) and rng.random() < 0.5)
+        nearby = [cell for cell in roads if max(abs(cell[0] - start[0]), abs(cell[1] - start[1])) <= 5]
+        obstacles.update(rng.sample(nearby, min(len(nearby), rng.randint(0, 8))))
+        obstacles.discard(start)
+
+        # Half of the queries are static routes
+        if rng.random() < 0.5: obstacles = set()
+
+        yield start, goal, obstacles, rng.choice([4, 2, 8, 16, 64])
+
+def run(city_file, engines, count, seed) -> dict:
+    model = TrafficModel(city_file=city_file, seed=seed)
+    gps = model.gps
+    searches = {name: factory(gps) for name, factory in engines.items()}
+    stats = {name: {"latencies": [], "expanded": [], "errors": [], "skipped": 0} for name in engines}
+
+    for start, goal, obstacles, obstacle_cost in queries(model, count, random.Random(seed)):
+        expected = None
+
+        for name, search in searches.items():
+            begin = perf_counter()
+            result = search(start, goal, obstacles, obstacle_cost)
+            elapsed = perf_counter() - begin
+
+            if result is False:
+                stats[name]["skipped"] += 1
+                continue
+
+            path, expanded = result
+            stats[name]["latencies"].append(elapsed)
+            stats[name]["expanded"].append(expanded)
+
+            if name == "astar":
+                expected = None if path is None else path_cost(gps, start, path, obstacles, obstacle_cost)
+
+            query = (start, goal, len(obstacles), obstacle_cost)
+            if (path is None) != (expected is None):
+                stats[name]["errors"].append((query, "route found by one engine only"))
+            elif path is not None:
+                reason = illegal(gps, start, goal, path)
+                cost = path_cost(gps, start, path, obstacles, obstacle_cost)
+                if reason is not None:
+                    stats[name]["errors"].append((query, reason))
+                elif cost != expected:
+                    stats[name]["errors"].append((query, f"cost {cost} instead of {expected}"))
+
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check and benchmark route engines against GPS.astar.')
+    parser.add_argument('--queries', type=int, default=500, help='Queries per city file.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the queries.')
+    parser.add_argument('--engines', type=str, nargs="+", default=list(ENGINES), help='Built in engines to run.')
+    parser.add_argument('--engine', type=str, action="append", default=[], help='Extra engine as module:factory.')
+    args = parser.parse_args()
+
+    # The reference always runs first
+    engines = {"astar": reference}
+    engines.update((name, ENGINES[name]) for name in args.engines)
+    for spec in args.engine:
+        module, factory = spec.split(":")
+        engines[spec] = getattr(importlib.import_module(module), factory)
+
+    failed = False
+    print("city engine queries skipped errors p50_us p90_us p99_us expanded")
+
+    for city_file in CITY_FILES:
+        stats = run(city_file, engines, args.queries, args.seed)
+
+        for name, engine in stats.items():
+            latencies = np.array(engine["latencies"]) * 1e6
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) > 0 else (0, 0, 0)
+            expanded = np.mean(engine["expanded"]) if len(engine["expanded"]) > 0 else 0
+            print(os.path.basename(city_file), name, len(latencies), engine["skipped"], len(engine["errors"]),
+                  f"{p50:.1f}", f"{p90:.1f}", f"{p99:.1f}", f"{expanded:.1f}")
+
+            for query, reason in engine["errors"][:5]:
+                print("   ", query, reason)
+            failed = failed or len(engine["errors"]) > 0
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+# Competition poster check
+# Runs the Poster against a local stand-in of the competition server that
+# can be slow, fail or hang, and checks that posts are coalesced, retried
+# and never pile up threads. Exits with an error if any check fails.
+
+# Usage (from Backend): python -m benchmarks.poster
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, active_count
+from time import sleep
+import json
+import sys
+
+from TrafficSimulation.model import TrafficModel
+from TrafficSimulation.poster import Poster
+
+class StandIn(ThreadingHTTPServer):
+    def __init__(self, delay = 0.0, failures = 0) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.delay = delay
+        self.failures = failures
+        self.requests = 0
+        self.received = []
+        Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests += 1
+        sleep(server.delay)
+
+        if server.requests <= server.failures:
+            self.send_response(503)
+        else:
+            server.received.append(body["num_cars"])
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+def check(name, condition, detail) -> bool:
+    print(f"{'ok' if condition else 'FAIL':>4} {name}: {detail}")
+    return condition
+
+def posts(server, poster, counts, interval = 0.0) -> None:
+    for count in counts:
+        poster.submit({"num_cars": count})
+        sleep(interval)
+    poster.close(timeout=10)
+
+if __name__ == '__main__':
+    results = []
+
+    server = StandIn()
+    poster = Poster(server.url)
+    posts(server, poster, range(5), interval=0.05)
+    results.append(check("every post arrives", server.received == list(range(5)),
+                         f"received {server.received}"))
+
+    server = StandIn(delay=0.2)
+    poster = Poster(server.url)
+    threads = active_count()
+    for count in range(50):
+        poster.submit({"num_cars": count})
+    results.append(check("one sender thread", active_count() <= threads + 2,
+                         f"{active_count() - threads} new threads for 50 posts"))
+    poster.close(timeout=10)
+    results.append(check("slow server gets the latest count", server.received[-1] == 49 and poster.coalesced > 0,
+                         f"received {server.received}, coalesced {poster.coalesced}"))
+
+    server = StandIn(failures=2)
+    poster = Poster(server.url, backoff=0.05)
+    posts(server, poster, [7])
+    results.append(check("failed posts are retried", server.received == [7] and poster.retried == 2,
+                         f"received {server.received} after {poster.retried} retries"))
+
+    server = StandIn(delay=1.0)
+    poster = Poster(server.url, timeout=0.1, retries=1, backoff=0.05)
+    posts(server, poster, [1])
+    results.append(check("hung server times out", poster.failed == 1 and poster.sent == 0,
+                         f"{poster.failed} failed, {poster.sent} sent"))
+
+    server = StandIn()
+    model = TrafficModel(post_cycle=10, self_url=server.url, limit=100)
+    while model.running:
+        model.step()
+    model.close(timeout=10)
+    results.append(check("model posts its arrivals", len(server.received) > 0 and server.received[-1] == model.num_arrivals,
+                         f"received {server.received}, {model.num_arrivals} arrivals"))
+
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,156 @@
+# Simulation throughput benchmark
+# Runs every shipped city file and a few generated big cities at several
+# spawn cycles with fixed seeds, and reports steps per second, A* calls and
+# expanded nodes per second, model construction time and peak memory.
+
+# Results can be saved as a JSON baseline, and compared against one: the
+# run fails when a case is slower (or bigger) than the baseline by more than
+# the threshold. Same seeds give the same runs, so arrivals and A* calls
+# must match too (a difference means the simulation itself changed).
+
+# Usage (from Backend):
+#   python -m benchmarks.throughput --save baseline.json
+#   python -m benchmarks.throughput --compare baseline.json --threshold 0.15
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from TrafficSimulation.model import TrafficModel
+from TrafficSimulation.template import CityTemplate
+from benchmarks.citygen import generate
+from time import perf_counter
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+
+CITY_FILES = sorted(glob.glob(f'{os.path.dirname(__file__)}/../TrafficSimulation/city_files/*.txt'))
+
+# Generated cities: name -> (blocks per side, block size)
+GENERATED = {
+    "generated_8x6": (8, 6),
+    "generated_12x6": (12, 6),
+}
+
+def cities(directory) -> dict:
+    files = {os.path.basename(path): path for path in CITY_FILES}
+
+    for name, (blocks, size) in GENERATED.items():
+        path = os.path.join(directory, f"{name}.txt")
+        with open(path, "w") as city:
+            city.write("\n".join(generate(blocks, size, seed=0)))
+        files[name] = path
+
+    return files
+
+def simulate(city_file, agent_cycle, steps, seed):
+    model = TrafficModel(city_file=city_file, agent_cycle=agent_cycle, limit=steps + 1, seed=seed)
+    for _ in range(steps):
+        model.step()
+    return model
+
+def measure(city_file, agent_cycle, steps, seed, memory = True, repeat = 3) -> dict:
+    # Best of a few runs, short runs are noisy
+    build, elapsed = float("inf"), float("inf")
+
+    for _ in range(repeat):
+        # Construction from scratch (the city template is shared by later models)
+        CityTemplate.clear()
+        start = perf_counter()
+        TrafficModel(city_file=city_file, agent_cycle=agent_cycle, seed=seed)
+        build = min(build, perf_counter() - start)
+
+        start = perf_counter()
+        model = simulate(city_file, agent_cycle, steps, seed)
+        elapsed = min(elapsed, perf_counter() - start)
+
+    result = {
+        "build_ms": build * 1000,
+        "steps_per_s": steps / elapsed,
+        "astar_calls_per_s": model.gps.calls / elapsed,
+        "nodes_per_s": model.gps.expanded / elapsed,
+        "astar_calls": model.gps.calls,
+        "arrivals": model.num_arrivals,
+        "cars": model.num_agents,
+    }
+
+    # Separate run, tracemalloc slows everything down
+    if memory:
+        CityTemplate.clear()
+        tracemalloc.start()
+        simulate(city_file, agent_cycle, steps, seed)
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return result
+
+# Metrics where more is better and where less is better
+FASTER = ("steps_per_s",)
+SMALLER = ("build_ms", "peak_mb")
+EXACT = ("arrivals", "astar_calls", "cars")
+
+def compare(results, baseline, threshold) -> bool:
+    failed = False
+
+    for case, result in results.items():
+        if case not in baseline: continue
+        base = baseline[case]
+
+        for metric in FASTER + SMALLER:
+            if metric not in result or metric not in base: continue
+            change = result[metric] / base[metric] - 1
+            worse = -change if metric in FASTER else change
+            if worse > threshold:
+                failed = True
+                print(f"REGRESSION {case} {metric}: {base[metric]:.2f} -> {result[metric]:.2f} ({change:+.1%})")
+
+        for metric in EXACT:
+            if result.get(metric) != base.get(metric):
+                print(f"CHANGED {case} {metric}: {base.get(metric)} -> {result.get(metric)}")
+
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the simulation throughput.')
+    parser.add_argument('--cycles', type=int, nargs="+", default=[10, 5, 2], help='Spawn cycles to test.')
+    parser.add_argument('--steps', type=int, default=500, help='Steps per run.')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of every run.')
+    parser.add_argument('--cities', type=str, nargs="+", default=None, help='Cases to run (file names or generated_*).')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case (the fastest one is kept).')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory run.')
+    parser.add_argument('--save', type=str, default=None, help='Save the results as a JSON baseline.')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Max relative regression.')
+    args = parser.parse_args()
+
+    results = {}
+    print("case steps/s astar/s nodes/s build_ms peak_mb arrivals")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, path in cities(directory).items():
+            if args.cities is not None and name not in args.cities: continue
+
+            for cycles in args.cycles:
+                case = f"{name}@{cycles}"
+                result = measure(path, cycles, args.steps, args.seed, not args.no_memory, args.repeat)
+                results[case] = result
+                print(case, f"{result['steps_per_s']:.1f}", f"{result['astar_calls_per_s']:.1f}",
+                      f"{result['nodes_per_s']:.0f}", f"{result['build_ms']:.1f}",
+                      f"{result.get('peak_mb', float('nan')):.2f}", result["arrivals"])
+
+    if args.save is not None:
+        with open(args.save, "w") as baseline:
+            json.dump({
+                "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                         "steps": args.steps, "seed": args.seed},
+                "cases": results
+            }, baseline, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as baseline:
+            failed = compare(results, json.load(baseline)["cases"], args.threshold)
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,87 @@
+# Binary Snapshots
+# Packed layout for /agents/<type>, served instead of JSON when the client
+# asks for it (Accept: application/vnd.duckcity.agents).
+
+# Little endian, structure of arrays, every array aligned to its item size:
+#   header   16 bytes  magic "DUCK", uint16 version, uint8 kind (0 car,
+#                      1 stoplight), uint8 reserved, uint32 step, uint32 count
+#   ids      int32[count]   number in the id ("car_12" -> 12, "tl_40" -> 40)
+#   x        int16[count]
+#   z        int16[count]
+#   flags    uint8[ceil(count / 8)]   bit i (lsb first) is arrived for cars
+#                                     and red for stoplights
+# The y coordinate is constant (0.3 for cars, 0 for stoplights), so it is
+# not sent. See api_container/README.md.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+import struct
+import numpy as np
+
+from TrafficSimulation.agents import Car
+from TrafficSimulation.utilities import Colors
+
+MAGIC = b"DUCK"
+VERSION = 1
+MIMETYPE = "application/vnd.duckcity.agents"
+
+CAR = 0
+STOPLIGHT = 1
+
+HEADER = struct.Struct("<4sHBBII")
+
+def pack(kind, step, ids, xs, zs, flags) -> bytes:
+    count = len(ids)
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, kind, 0, step, count),
+        np.asarray(ids, dtype="<i4").tobytes(),
+        np.asarray(xs, dtype="<i2").tobytes(),
+        np.asarray(zs, dtype="<i2").tobytes(),
+        np.packbits(np.asarray(flags, dtype=bool), bitorder="little").tobytes()
+    ))
+
+def unpack(data: bytes) -> dict:
+    magic, version, kind, _, step, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a DuckCity snapshot")
+
+    offset = HEADER.size
+    ids = np.frombuffer(data, "<i4", count, offset)
+    xs = np.frombuffer(data, "<i2", count, offset + 4*count)
+    zs = np.frombuffer(data, "<i2", count, offset + 6*count)
+    flags = np.unpackbits(np.frombuffer(data, np.uint8, (count + 7) // 8, offset + 8*count), 
+                          count=count, bitorder="little").astype(bool)
+
+    return {"kind": kind, "step": step, "ids": ids, "x": xs, "z": zs, "flags": flags}
+
+# Arrays straight from the model
+
+def cars(model):
+    agents = model.agents_by_type[Car].values()
+    count = len(agents)
+
+    ids = np.fromiter((int(agent.unique_id[4:]) for agent in agents), np.int32, count)
+    cells = np.fromiter((agent.pos[0] * model.height + agent.pos[1] for agent in agents), np.int64, count)
+    arrived = np.fromiter((agent.arrived for agent in agents), bool, count)
+
+    return ids, cells // model.height, cells % model.height, arrived
+
+def stoplights(model):
+    ids = np.fromiter((int(light.unique_id[3:]) for light in model.traffic_lights), 
+                      np.int32, len(model.traffic_lights))
+    cells = model.light_cells
+
+    return ids, cells // model.height, cells % model.height, model.lights.colors == Colors.RED.value
+
+# Arrays from frames (lists of the JSON records)
+
+def records(kind, data):
+    if kind == CAR:
+        ids = [int(record["id"][4:]) for record in data]
+        flags = [record["arrived"] for record in data]
+    else:
+        ids = [int(record["id"][3:]) for record in data]
+        flags = [record["color"] == "red" for record in data]
+
+    return ids, [record["x"] for record in data], [record["z"] for record in data], flags
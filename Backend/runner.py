@@ -1,4 +1,6 @@
 from TrafficSimulation.model import TrafficModel
+from TrafficSimulation import checkpoint
+from TrafficSimulation.metrics import StepMetrics
 import argparse
 import os
 
@@ -6,33 +8,69 @@ import os
 if __name__ == "__main__":
     env = os.environ
     parser = argparse.ArgumentParser(description='Run the traffic simulation.')
-    parser.add_argument('--cycles', type=int, default=int(env.get("AGENT_CYCLE", 10)), help='Number of cycles in between agent spawners.')
-    parser.add_argument('--post_step', type=int, default=int(env.get("POST_STEP", 100)), help='Number of steps in between posts.')
+    parser.add_argument('--cycles', type=int, default=env.get("AGENT_CYCLE", None), help='Number of cycles in between agent spawners (10).')
+    parser.add_argument('--post_step', type=int, default=env.get("POST_STEP", None), help='Number of steps in between posts (100).')
     parser.add_argument('--url', type=str, default=env.get("URL", None), help='Server URL for competition.')
     parser.add_argument('--log', type=str, default=env.get("LOG", None), help='File to log results to.')
-    parser.add_argument('--limit', type=int, default=int(env.get("LIMIT", 1000)), help='Number of steps to run.')
+    parser.add_argument('--limit', type=int, default=env.get("LIMIT", None), help='Number of steps to run (1000).')
+    parser.add_argument('--planner', type=str, default=env.get("PLANNER", None), choices=["astar", "dstar"], help='Replanning engine for blocked cars (astar).')
+    parser.add_argument('--replan_budget', type=int, default=env.get("REPLAN_BUDGET", None), help='Max number of route recalculations per step.')
+    parser.add_argument('--replan_ms', type=float, default=env.get("REPLAN_MS", None), help='Max milliseconds spent recalculating routes per step.')
+    parser.add_argument('--activation', type=str, default=env.get("ACTIVATION", None), choices=["random", "event", "synchronous"], help='Scheduler used to activate the cars (random).')
+    parser.add_argument('--city', type=str, default=env.get("CITY_FILE", None), help='City file to simulate (defaults to 2023_base.txt).')
+    parser.add_argument('--seed', type=int, default=int(env["SEED"]) if "SEED" in env else None, help='Seed of the random number generator (forks a resumed run).')
+    parser.add_argument('--checkpoint-at', type=int, default=None, help='Step in which a checkpoint of the run is saved.')
+    parser.add_argument('--checkpoint', type=str, default="checkpoint.json.gz", help='File the checkpoint is saved to.')
+    parser.add_argument('--resume-from', type=str, default=None, help='Checkpoint to continue from.')
+    parser.add_argument('--metrics', action='store_true', default=env.get("METRICS", "0") == "1", help='Log phase timers (ms) and counters of every step.')
+    parser.add_argument('--cache', type=str, default=env.get("CACHE_DIR", None), help='Directory to cache compiled maps and precomputed distance fields.')
     args = parser.parse_args()
 
     f = None
 
     if args.log is not None:
         f = open(f'{os.path.dirname(__file__)}/{args.log}', "w")
-        f.write("step arrivals\n")
+        columns = ["step", "arrivals"]
+        if args.metrics:
+            # Arrivals are already the second column (total, not per step)
+            columns += [name.replace("_seconds", "_ms") for name in StepMetrics().values() if name != "arrivals"]
+        f.write(" ".join(columns) + "\n")
         f.flush()
 
-    model = TrafficModel(agent_cycle=args.cycles,
-                         post_cycle=args.post_step,
-                         self_url=args.url,
-                         limit=args.limit)
-    
-    print("Model Initialized")
+    # Only the options that were given (flags or environment), the model
+    # defaults apply to the rest and a resumed run keeps its saved values
+    params = dict(agent_cycle=args.cycles,
+                  post_cycle=args.post_step,
+                  limit=args.limit,
+                  planner=args.planner,
+                  replan_budget=args.replan_budget,
+                  replan_time_budget=None if args.replan_ms is None else args.replan_ms / 1000,
+                  activation=args.activation)
+    params = {name: value for name, value in params.items() if value is not None}
+    params.update(self_url=args.url, cache_dir=args.cache, metrics=args.metrics)
+
+    if args.resume_from is not None:
+        if args.city is not None: params["city_file"] = args.city
+        model = TrafficModel.restore(checkpoint.load(args.resume_from), seed=args.seed, **params)
+        print("Model Restored at Step:", model.num_steps)
+    else:
+        model = TrafficModel(city_file=args.city, seed=args.seed, **params)
+        print("Model Initialized")
 
     while model.running:
         model.step()
         print("Model updated.", "Current Step:", model.num_steps)
         if f is not None:
-            f.write(f"{model.num_steps} {model.num_arrivals}\n")
+            row = [model.num_steps, model.num_arrivals]
+            if args.metrics:
+                row += [f"{value * 1000:.3f}" if name.endswith("_seconds") else value
+                        for name, value in model.metrics.last.items() if name != "arrivals"]
+            f.write(" ".join(map(str, row)) + "\n")
             f.flush()
+        if model.num_steps == args.checkpoint_at:
+            checkpoint.save(model.checkpoint(), args.checkpoint)
+            print("Checkpoint saved to", args.checkpoint)
 
     if f is not None: f.close()
+    model.close()
     print("Simulation ended.")
\ No newline at end of file
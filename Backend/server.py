@@ -1,7 +1,9 @@
 from TrafficSimulation.agents import *
 from TrafficSimulation.model import TrafficModel
+from TrafficSimulation.citymap import CityMap, DEFAULT_CITY_FILE
 from mesa.visualization import CanvasGrid, BarChartModule
 from mesa.visualization import ModularServer
+from collections import defaultdict
 import os
 
 import argparse
@@ -40,31 +42,56 @@ def agent_portrayal(agent):
 
     return portrayal
 
+# Roads, obstacles and destinations are not in the grid anymore, so they are
+# drawn from the static map layer of the model (only built once per model)
+class CityGrid(CanvasGrid):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.city = None
+        self.tiles = defaultdict(list)
+
+    def render(self, model):
+        if self.city is not model.city:
+            self.city = model.city
+            self.tiles = defaultdict(list)
+
+            for tile in model.city.tiles(model):
+                portrayal = self.portrayal_method(tile)
+                if portrayal:
+                    portrayal["x"], portrayal["y"] = tile.pos
+                    self.tiles[portrayal["Layer"]].append(portrayal)
+
+        grid_state = super().render(model)
+
+        for layer, portrayals in self.tiles.items():
+            grid_state[layer] = portrayals + grid_state[layer]
+
+        return grid_state
+
 if __name__ == "__main__":
     env = os.environ
 
-    width = 0
-    height = 0
-
     parser = argparse.ArgumentParser(description='Run the traffic simulation.')
     parser.add_argument('--cycles', type=int, default=int(env.get("AGENT_CYCLE", 10)), help='Number of cycles in between agent spawners.')
     parser.add_argument('--post_step', type=int, default=int(env.get("POST_STEP", 100)), help='Number of steps in between posts.')
     parser.add_argument('--url', type=str, default=env.get("URL", None), help='Server URL for competition.')
+    parser.add_argument('--city', type=str, default=env.get("CITY_FILE", DEFAULT_CITY_FILE), help='City file to simulate (defaults to 2023_base.txt).')
+    parser.add_argument('--cache', type=str, default=env.get("CACHE_DIR", None), help='Directory to cache compiled maps and distance fields.')
     args = parser.parse_args()
 
-    with open(f'{os.path.dirname(__file__)}/TrafficSimulation/city_files/2021_base2.txt') as baseFile:
-        lines = baseFile.readlines()
-        width = len(lines[0])-1
-        height = len(lines)
+    # The canvas has the size of the map that is simulated
+    city = CityMap.from_file(args.city, args.cache)
 
-    print(width, height)
-    grid = CanvasGrid(agent_portrayal, width, height, 500, 500)
+    print(city.width, city.height)
+    grid = CityGrid(agent_portrayal, city.width, city.height, 500, 500)
 
     server = ModularServer(
         TrafficModel, [grid], "Traffic", 
         {"agent_cycle": args.cycles,
          "post_cycle": args.post_step,
-         "self_url": args.url}
+         "self_url": args.url,
+         "city_file": args.city,
+         "cache_dir": args.cache}
     )
                         
     server.port = 8521 # The default
@@ -0,0 +1,175 @@
+# Simulation Sessions
+# Registry of the models served by the API. Each client gets its own model
+# (a session) so one backend process can serve many visualizers at once.
+
+# The registry is bounded: sessions idle for too long are evicted, and when
+# it is full the least recently used session makes room for the new one.
+# Every session has a lock, so concurrent requests never step the same model
+# at the same time, and a smaller one for its cached responses, so responses
+# built from published frames never wait for a step.
+
+# A session can also have a producer: a background thread that keeps a
+# bounded buffer of future steps already computed (and serialized), so
+# clients read frames instead of waiting on TrafficModel.step.
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from collections import OrderedDict, deque
+from threading import Condition, Lock, Thread
+from time import monotonic
+from uuid import uuid4
+
+class Session:
+    def __init__(self, session_id, model) -> None:
+        self.id = session_id
+        self.model = model
+        self.lock = Lock()
+        self.last_used = monotonic()
+
+        # The last frame read by the client (with a producer, and in asgi.py)
+        self.producer = None
+        self.frame = None
+
+        # Serialized responses of the current step (key -> (step, data), the
+        # step lets asgi.py read them without the lock)
+        self.responses = dict()
+        self.responses_step = None
+        self.cache_lock = Lock()
+
+    def touch(self) -> None:
+        self.last_used = monotonic()
+
+    # Response for key in the given step, built only once per step (build
+    # must not need the model lock unless the caller already holds it)
+    def cached(self, step, key, build):
+        with self.cache_lock:
+            if step != self.responses_step:
+                self.responses = dict()
+                self.responses_step = step
+
+            if key not in self.responses:
+                self.responses[key] = (step, build())
+            return self.responses[key][1]
+
+class FrameProducer(Thread):
+    def __init__(self, session, snapshot, capacity = 32) -> None:
+        super().__init__(daemon=True)
+        self.session = session
+        self.snapshot = snapshot
+        self.capacity = capacity
+
+        self.frames = deque()
+        self.condition = Condition()
+        self.stopped = False
+        self.finished = False
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while len(self.frames) >= self.capacity and not self.stopped:
+                    self.condition.wait()
+                if self.stopped: return
+
+            frame = None
+
+            with self.session.lock:
+                model = self.session.model
+                if model.running:
+                    model.step()
+                    frame = self.snapshot(model)
+
+            with self.condition:
+                # The simulation ended, clients get what is left
+                if frame is None:
+                    self.finished = True
+                    self.condition.notify_all()
+                    return
+
+                self.frames.append(frame)
+                self.condition.notify_all()
+
+    # Up to count frames, waits at most timeout seconds for the first one
+    def take(self, count, timeout = 5.0) -> list:
+        frames = []
+
+        with self.condition:
+            while len(frames) < count:
+                if len(self.frames) > 0:
+                    frames.append(self.frames.popleft())
+                elif len(frames) > 0 or self.finished or self.stopped:
+                    break
+                elif not self.condition.wait(timeout):
+                    break
+
+            self.condition.notify_all()
+
+        return frames
+
+    def stop(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+class SessionRegistry:
+    def __init__(self, capacity = 16, idle_timeout = 900) -> None:
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.lock = Lock()
+
+        # Clients that don't send a session id get the latest one
+        self.latest = None
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    # Sessions at this moment (safe to iterate while others are created)
+    def snapshot(self) -> list:
+        with self.lock:
+            return list(self.sessions.values())
+
+    def evict_idle(self) -> None:
+        now = monotonic()
+        idle = [session_id for session_id, session in self.sessions.items() 
+                if now - session.last_used > self.idle_timeout]
+        for session_id in idle:
+            self.remove(session_id)
+
+    def remove(self, session_id) -> None:
+        session = self.sessions.pop(session_id, None)
+        if session is None: return
+
+        if session.producer is not None:
+            session.producer.stop()
+        # Without waiting for its last post
+        session.model.close(timeout=0)
+        if self.latest == session_id:
+            self.latest = None
+
+    def create(self, model) -> Session:
+        session = Session(uuid4().hex, model)
+
+        with self.lock:
+            self.evict_idle()
+            while len(self.sessions) >= self.capacity:
+                self.remove(next(iter(self.sessions)))
+
+            self.sessions[session.id] = session
+            self.latest = session.id
+
+        return session
+
+    def get(self, session_id = None) -> Session:
+        with self.lock:
+            self.evict_idle()
+
+            if session_id is None:
+                session_id = self.latest
+
+            session = self.sessions.get(session_id)
+            if session is None: return None
+
+            self.sessions.move_to_end(session_id)
+            session.touch()
+            return session
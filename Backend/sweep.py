@@ -0,0 +1,164 @@
+# Parameter Sweep
+# Runs every combination of a grid of TrafficModel parameters a number of
+# times (replicates, one seed each) over a pool of processes.
+
+# Every finished run is appended to a JSON lines file right away. Running the
+# same sweep again with the same file skips the runs already in it, so a
+# sweep that crashed (or was stopped) continues where it was. With
+# --ci-width, a configuration stops getting replicates once the 95%
+# confidence interval of its arrivals per step is narrower than the target.
+
+# Usage: python sweep.py --grid agent_cycle=2,5,10 limit=500 --replicates 20 --ci-width 0.02
+
+# Last Update: 18/Oct/2026
+# Joaquín Badillo, Pablo Bolio
+
+from TrafficSimulation.model import TrafficModel
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import product
+from statistics import mean, stdev
+from time import perf_counter
+import argparse
+import json
+import os
+
+# Two sided 95% quantiles of Student's t by degrees of freedom
+T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+       8: 2.306, 9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086,
+       25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+def t95(df: int) -> float:
+    # Closest tabulated value with fewer degrees of freedom (conservative)
+    known = [k for k in T95 if k <= df]
+    return T95[max(known)] if df <= 120 else 1.960
+
+def ci_width(values) -> float:
+    if len(values) < 2: return float("inf")
+    return 2 * t95(len(values) - 1) * stdev(values) / len(values) ** 0.5
+
+def parse_value(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return None if value == "None" else value
+
+def parse_grid(items) -> list:
+    axes = {}
+    for item in items:
+        name, values = item.split("=", 1)
+        axes[name] = [parse_value(value) for value in values.split(",")]
+
+    return [dict(zip(axes, values)) for values in product(*axes.values())]
+
+def key(config: dict) -> str:
+    return json.dumps(config, sort_keys=True)
+
+# Runs in a worker process
+def simulate(config: dict, seed: int) -> dict:
+    start = perf_counter()
+    model = TrafficModel(seed=seed, **config)
+    built = perf_counter()
+
+    while model.running:
+        model.step()
+
+    return {
+        "config": config,
+        "seed": seed,
+        "steps": model.num_steps,
+        "arrivals": model.num_arrivals,
+        "arrivals_per_step": model.num_arrivals / max(1, model.num_steps),
+        "cars": model.num_agents,
+        "build_seconds": built - start,
+        "seconds": perf_counter() - built,
+    }
+
+# Runs already in the results file by configuration (failed ones are retried)
+def load_results(path: str) -> dict:
+    done = {}
+    if not os.path.exists(path): return done
+
+    with open(path) as results:
+        for line in results:
+            try:
+                run = json.loads(line)
+            except json.JSONDecodeError:
+                continue # Half written line of a crashed sweep
+            if "error" in run: continue
+            done.setdefault(key(run["config"]), {})[run["seed"]] = run["arrivals_per_step"]
+    return done
+
+def sweep(configs, replicates, path, workers = None, width = None, min_replicates = 3, first_seed = 0) -> dict:
+    done = load_results(path)
+    values = {key(config): list(done.get(key(config), {}).values()) for config in configs}
+
+    # Seeds that still have to run, in order, for each configuration
+    queues = {
+        key(config): [seed for seed in range(first_seed, first_seed + replicates)
+                      if seed not in done.get(key(config), {})]
+        for config in configs
+    }
+    configs = {key(config): config for config in configs}
+
+    def finished(name) -> bool:
+        return width is not None and len(values[name]) >= min_replicates and ci_width(values[name]) <= width
+
+    def submit(pool, futures, name, count = 1) -> None:
+        for _ in range(count):
+            if finished(name) or len(queues[name]) == 0: return
+            seed = queues[name].pop(0)
+            futures[pool.submit(simulate, configs[name], seed)] = (name, seed)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(path, "a+") as results:
+        futures = {}
+
+        # A crash can leave a half written line
+        if results.tell() > 0:
+            results.seek(results.tell() - 1)
+            if results.read(1) != "\n": results.write("\n")
+
+        # Without early stop everything is queued at once, with it only the
+        # minimum, then one more run each time one ends above the target
+        for name in configs:
+            if width is None: submit(pool, futures, name, replicates)
+            else: submit(pool, futures, name, max(1, min_replicates - len(values[name])))
+
+        while len(futures) > 0:
+            completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in completed:
+                name, seed = futures.pop(future)
+
+                try:
+                    run = future.result()
+                    values[name].append(run["arrivals_per_step"])
+                except Exception as e:
+                    run = {"config": configs[name], "seed": seed, "error": repr(e)}
+
+                results.write(json.dumps(run) + "\n")
+                results.flush()
+                print(name, "seed", seed, "error" if "error" in run else f"{run['arrivals_per_step']:.4f}")
+
+                if width is not None: submit(pool, futures, name)
+
+    return {name: values[name] for name in configs}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a grid of simulations in parallel.')
+    parser.add_argument('--grid', type=str, nargs="+", default=["agent_cycle=10"], help='Parameters as name=value1,value2 (TrafficModel arguments).')
+    parser.add_argument('--replicates', type=int, default=10, help='Max runs (seeds) per configuration.')
+    parser.add_argument('--seed', type=int, default=0, help='First seed.')
+    parser.add_argument('--out', type=str, default="sweep.jsonl", help='Results file (runs in it are not repeated).')
+    parser.add_argument('--workers', type=int, default=None, help='Processes (defaults to every core).')
+    parser.add_argument('--ci-width', type=float, default=None, help='Stop a configuration once the 95%% CI of arrivals per step is this narrow.')
+    parser.add_argument('--min-replicates', type=int, default=3, help='Runs per configuration before stopping early.')
+    args = parser.parse_args()
+
+    summary = sweep(parse_grid(args.grid), args.replicates, args.out,
+                    args.workers, args.ci_width, args.min_replicates, args.seed)
+
+    print("config runs arrivals_per_step ci_width")
+    for name, runs in summary.items():
+        print(name, len(runs), f"{mean(runs):.4f}" if len(runs) > 0 else "-", f"{ci_width(runs):.4f}")
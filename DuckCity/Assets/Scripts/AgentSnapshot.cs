@@ -0,0 +1,47 @@
+// TC2008B. Sistemas Multiagentes y Gráficas Computacionales
+// Reader for the binary snapshots of /agents/<type> (Accept: application/vnd.duckcity.agents).
+// The arrays are views over the downloaded bytes, nothing is copied.
+// Joaquin Badillo, Pablo Bolio
+
+using System;
+using System.Buffers.Binary;
+using System.Runtime.InteropServices;
+
+public readonly ref struct AgentSnapshot {
+    public const string MimeType = "application/vnd.duckcity.agents";
+    public const int HeaderSize = 16;
+    public const ushort Version = 1;
+
+    // 0: cars, 1: stoplights
+    public readonly byte kind;
+    public readonly uint step;
+    public readonly int count;
+
+    // Number in the id ("car_12" -> 12, "tl_40" -> 40) and cell of each agent
+    public readonly ReadOnlySpan<int> ids;
+    public readonly ReadOnlySpan<short> x, z;
+    // Bit i (lsb first): arrived for cars, red for stoplights
+    readonly ReadOnlySpan<byte> flags;
+
+    public AgentSnapshot(ReadOnlySpan<byte> data) {
+        if (data.Length < HeaderSize || data[0] != 'D' || data[1] != 'U' || data[2] != 'C' || data[3] != 'K')
+            throw new FormatException("Not a DuckCity snapshot");
+        if (BinaryPrimitives.ReadUInt16LittleEndian(data.Slice(4)) != Version)
+            throw new FormatException("Unknown snapshot version");
+
+        kind = data[6];
+        step = BinaryPrimitives.ReadUInt32LittleEndian(data.Slice(8));
+        count = (int) BinaryPrimitives.ReadUInt32LittleEndian(data.Slice(12));
+
+        // Little endian like every platform Unity runs on
+        int offset = HeaderSize;
+        ids = MemoryMarshal.Cast<byte, int>(data.Slice(offset, 4 * count));
+        x = MemoryMarshal.Cast<byte, short>(data.Slice(offset + 4 * count, 2 * count));
+        z = MemoryMarshal.Cast<byte, short>(data.Slice(offset + 6 * count, 2 * count));
+        flags = data.Slice(offset + 8 * count, (count + 7) / 8);
+    }
+
+    public bool Flag(int i) => (flags[i >> 3] & (1 << (i & 7))) != 0;
+
+    public string Id(int i) => (kind == 0 ? "car_" : "tl_") + ids[i];
+}